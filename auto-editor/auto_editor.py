@@ -1,13 +1,28 @@
 import argparse
+import bisect
+import contextlib
+import cProfile
+import hashlib
+import heapq
 import json
+import math
+import operator
 import os
 import random
 import re
+import sqlite3
 import subprocess
 import sys
 import tempfile
-from dataclasses import dataclass
-from typing import List, Optional, Tuple
+import threading
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, make_dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ProgressCallback = Callable[[float], None]
 
 
 @dataclass
@@ -22,7 +37,185 @@ class Segment:
         return max(0.0, self.end - self.start)
 
 
+@dataclass
+class ProgressEvent:
+    stage: str
+    message: str
+    fraction: Optional[float] = None
+
+
+EventCallback = Callable[[ProgressEvent], None]
+
+
+@dataclass
+class RenderResult:
+    output: str
+    duration: float
+    segments: List[Segment] = field(default_factory=list)
+    lines: List[str] = field(default_factory=list)
+    dry_run: bool = False
+
+
+def peak_rss_mb(maxrss: int) -> float:
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere.
+    return maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def self_peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    return round(peak_rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss), 1)
+
+
+class Profiler:
+    """Wall time, CPU time and peak RSS per pipeline stage and subprocess.
+
+    Stages nest per thread; every run_cmd/stream_cmd call is attributed to
+    the innermost stage of the thread that started it. With ``cprofile_dir``
+    each outermost stage is also run under cProfile and its stats dumped.
+    """
+
+    def __init__(self, cprofile_dir: Optional[str] = None) -> None:
+        self.cprofile_dir = cprofile_dir
+        self.stages: List[dict] = []
+        self.commands: List[dict] = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.started = time.perf_counter()
+        self.next_id = 0
+        if cprofile_dir:
+            os.makedirs(cprofile_dir, exist_ok=True)
+
+    def current_stage(self) -> Tuple[Optional[int], str]:
+        """(id, name) of this thread's innermost stage; id None outside any."""
+        stack = getattr(self.local, "stack", None)
+        return stack[-1] if stack else (None, "main")
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        stack = self.local.__dict__.setdefault("stack", [])
+        parent = stack[-1][1] if stack else None
+        # Stage names repeat (one "encode chunk" per chunk), so commands are
+        # attributed by this id rather than by name.
+        with self.lock:
+            stage_id = self.next_id
+            self.next_id += 1
+        stack.append((stage_id, name))
+        # Nested stages are covered by their outermost one. Worker-thread
+        # stages are never profiled: on Python 3.12+ only one profiler may be
+        # active per process, and the main thread's already is.
+        prof = None
+        if self.cprofile_dir and parent is None and threading.current_thread() is threading.main_thread():
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:
+                prof = None
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            if prof:
+                prof.disable()
+            stack.pop()
+            record = {
+                "id": stage_id,
+                "stage": name,
+                "parent": parent,
+                "thread": threading.current_thread().name,
+                "start_sec": round(wall - self.started, 4),
+                "wall_sec": round(time.perf_counter() - wall, 4),
+                "cpu_sec": round(time.thread_time() - cpu, 4),
+                "peak_rss_mb": self_peak_rss_mb(),
+            }
+            with self.lock:
+                seq = len(self.stages)
+                self.stages.append(record)
+            if prof:
+                safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+                prof.dump_stats(os.path.join(self.cprofile_dir, f"{seq:03d}-{safe}.prof"))
+
+    def record_command(self, cmd: List[str], wall: float, usage: Any) -> None:
+        text = " ".join(cmd)
+        stage_id, stage = self.current_stage()
+        record = {
+            "program": os.path.basename(cmd[0]),
+            "stage": stage,
+            "stage_id": stage_id,
+            "wall_sec": round(wall, 4),
+            "cpu_sec": round(usage.ru_utime + usage.ru_stime, 4) if usage else None,
+            "peak_rss_mb": round(peak_rss_mb(usage.ru_maxrss), 1) if usage else None,
+            "cmd": text if len(text) <= 300 else text[:297] + "...",
+        }
+        with self.lock:
+            self.commands.append(record)
+
+    def report(self) -> dict:
+        with self.lock:
+            stages = [dict(stage) for stage in self.stages]
+            commands = list(self.commands)
+        by_stage: Dict[int, List[dict]] = {}
+        for c in commands:
+            by_stage.setdefault(c["stage_id"], []).append(c)
+        for stage in stages:
+            own = by_stage.get(stage["id"], [])
+            stage["commands"] = len(own)
+            stage["command_wall_sec"] = round(sum(c["wall_sec"] for c in own), 4)
+            stage["command_cpu_sec"] = round(sum(c["cpu_sec"] or 0.0 for c in own), 4)
+        return {
+            "wall_sec": round(time.perf_counter() - self.started, 4),
+            "cpu_sec": round(time.process_time(), 4),
+            "peak_rss_mb": self_peak_rss_mb(),
+            "stages": sorted(stages, key=lambda s: s["start_sec"]),
+            "commands": commands,
+        }
+
+    def print_summary(self, file: Any = sys.stderr) -> None:
+        report = self.report()
+        print(f"{'stage':<28}{'wall s':>9}{'cpu s':>9}{'cmd cpu':>10}{'cmds':>6}{'rss MB':>9}", file=file)
+        for stage in report["stages"]:
+            name = ("  " if stage["parent"] else "") + stage["stage"]
+            rss = stage["peak_rss_mb"]
+            print(
+                f"{name[:28]:<28}{stage['wall_sec']:>9.2f}{stage['cpu_sec']:>9.2f}"
+                f"{stage['command_cpu_sec']:>10.2f}{stage['commands']:>6}"
+                f"{rss if rss is not None else '-':>9}",
+                file=file,
+            )
+        slowest = sorted(report["commands"], key=lambda c: c["wall_sec"], reverse=True)[:5]
+        for cmd in slowest:
+            print(f"{cmd['wall_sec']:>8.2f}s [{cmd['stage']}] {cmd['cmd'][:100]}", file=file)
+        print(f"total {report['wall_sec']:.2f}s wall, {report['cpu_sec']:.2f}s cpu", file=file)
+
+
+# Set by main() for --profile / --timings-json / --cprofile-dir.
+PROFILER: Optional[Profiler] = None
+
+
+def timed_stage(name: str):
+    return PROFILER.stage(name) if PROFILER else contextlib.nullcontext()
+
+
+def reap(proc: subprocess.Popen, cmd: List[str], started: float) -> int:
+    """Wait for ``proc``; under profiling, record its own rusage via wait4."""
+    profiler = PROFILER
+    if profiler is None:
+        return proc.wait()
+    usage = None
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    else:
+        proc.wait()
+    profiler.record_command(cmd, time.perf_counter() - started, usage)
+    return proc.returncode
+
+
 def run_cmd(cmd: List[str]) -> Tuple[int, str, str]:
+    started = time.perf_counter()
     proc = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
@@ -30,8 +223,55 @@ def run_cmd(cmd: List[str]) -> Tuple[int, str, str]:
         text=True,
         encoding="utf-8",
     )
-    out, err = proc.communicate()
-    return proc.returncode, out, err
+    if PROFILER is None:
+        out, err = proc.communicate()
+        return proc.returncode, out, err
+    # Drain both pipes without reaping, so reap() can read the child's usage.
+    assert proc.stdout is not None and proc.stderr is not None
+    out_box: List[str] = []
+    reader = threading.Thread(target=lambda: out_box.append(proc.stdout.read()))
+    reader.start()
+    err = proc.stderr.read()
+    reader.join()
+    proc.stdout.close()
+    proc.stderr.close()
+    return reap(proc, cmd, started), out_box[0], err
+
+
+def stream_cmd(cmd: List[str], on_line: Callable[[str], None], tail_lines: int = 20) -> Tuple[int, str]:
+    """Run ``cmd`` feeding each stderr line to ``on_line`` as it arrives.
+
+    Only the last ``tail_lines`` lines are kept, for error messages.
+    """
+    # Universal newlines also split ffmpeg's \r-terminated stats lines.
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    tail: deque = deque(maxlen=tail_lines)
+    assert proc.stderr is not None
+    with proc.stderr:
+        for line in proc.stderr:
+            on_line(line)
+            tail.append(line)
+    return reap(proc, cmd, started), "".join(tail)
+
+
+FFMPEG_CLOCK_RE = re.compile(r"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def report_progress(line: str, progress: Optional[ProgressCallback]) -> None:
+    if progress is None or "time=" not in line:
+        return
+    match = FFMPEG_CLOCK_RE.search(line)
+    if match:
+        hours, minutes, secs = match.groups()
+        progress(int(hours) * 3600 + int(minutes) * 60 + float(secs))
 
 
 def ffprobe_duration(path: str) -> float:
@@ -52,33 +292,288 @@ def ffprobe_duration(path: str) -> float:
     return float(data["format"]["duration"])
 
 
-def detect_scene_changes(path: str, threshold: float) -> List[float]:
+@dataclass
+class AnalysisOptions:
+    mode: str = "full"
+    width: int = 320
+    fps: float = 0.0
+    keyframes_only: bool = False
+    threads: int = 0
+
+    def variant(self) -> str:
+        # Threads do not change results, so they are not part of the cache key.
+        if self.mode != "fast":
+            return "full"
+        return f"fast:w{self.width}:fps{self.fps:g}:kf{int(self.keyframes_only)}"
+
+
+def analysis_options_from_args(args: argparse.Namespace) -> AnalysisOptions:
+    return AnalysisOptions(
+        mode=args.analysis_mode,
+        width=args.analysis_width,
+        fps=args.analysis_fps,
+        keyframes_only=args.keyframes_only,
+        threads=args.analysis_threads,
+    )
+
+
+def analysis_ffmpeg_args(
+    path: str, options: Optional[AnalysisOptions]
+) -> Tuple[List[str], str]:
+    """Return the ffmpeg input arguments and the filter prefix for analysis."""
+    options = options or AnalysisOptions()
+    input_args = ["ffmpeg", "-hide_banner"]
+    if options.threads > 0:
+        input_args += ["-threads", str(options.threads)]
+    if options.mode != "fast":
+        return input_args + ["-i", path], ""
+    if options.keyframes_only:
+        input_args += ["-skip_frame", "nokey"]
+    input_args += ["-i", path, "-an", "-sn", "-dn"]
+    filters = []
+    if options.fps > 0:
+        filters.append(f"fps={options.fps:g}")
+    # Scene scores only need a small proxy; -2 keeps the height even.
+    filters.append(f"scale={options.width}:-2:flags=fast_bilinear")
+    return input_args, ",".join(filters) + ","
+
+
+def detect_scene_changes(
+    path: str,
+    threshold: float,
+    options: Optional[AnalysisOptions] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> List[float]:
     # Use ffmpeg scene detection with showinfo timestamps.
-    cmd = [
-        "ffmpeg",
-        "-hide_banner",
-        "-i",
-        path,
+    input_args, vf_prefix = analysis_ffmpeg_args(path, options)
+    cmd = input_args + [
         "-vf",
-        f"select='gt(scene,{threshold})',showinfo",
+        f"{vf_prefix}select='gt(scene,{threshold})',showinfo",
         "-f",
         "null",
         "-",
     ]
-    _, _, err = run_cmd(cmd)
-    times = []
-    for line in err.splitlines():
+    times = set()
+
+    def on_line(line: str) -> None:
+        report_progress(line, progress)
         if "showinfo" not in line:
-            continue
+            return
         # Example: n:  23 pts:12345 pts_time:0.987 ...
         if "pts_time:" in line:
             try:
                 parts = line.split("pts_time:")[1].split()
-                times.append(float(parts[0]))
+                times.add(float(parts[0]))
             except (ValueError, IndexError):
-                continue
-    times = sorted(set(t for t in times if t > 0))
-    return times
+                return
+
+    code, err_tail = stream_cmd(cmd, on_line)
+    if code != 0:
+        raise RuntimeError(f"ffmpeg scene detection failed for {path}: {err_tail.strip()}")
+    return sorted(t for t in times if t > 0)
+
+
+class SceneScoreParser:
+    """Incremental parser for ``metadata=print`` scene score output."""
+
+    def __init__(self) -> None:
+        self.times = array("d")
+        self.scores = array("d")
+        self._pts_time: Optional[float] = None
+
+    def feed(self, line: str) -> None:
+        # metadata=print logs "frame:N pts:P pts_time:T" followed by
+        # "lavfi.scene_score=S" for every frame.
+        if "pts_time:" in line:
+            try:
+                self._pts_time = float(line.split("pts_time:")[1].split()[0])
+            except (ValueError, IndexError):
+                self._pts_time = None
+        elif "lavfi.scene_score=" in line and self._pts_time is not None:
+            try:
+                score = float(line.split("lavfi.scene_score=")[1].split()[0])
+            except (ValueError, IndexError):
+                return
+            self.times.append(self._pts_time)
+            self.scores.append(score)
+            self._pts_time = None
+
+
+def parse_scene_scores(lines: List[str]) -> Tuple[array, array]:
+    parser = SceneScoreParser()
+    for line in lines:
+        parser.feed(line)
+    return parser.times, parser.scores
+
+
+def extract_scene_scores(
+    path: str,
+    options: Optional[AnalysisOptions] = None,
+    progress: Optional[ProgressCallback] = None,
+) -> Tuple[array, array]:
+    # Record the raw score of every frame so any threshold can be applied later.
+    input_args, vf_prefix = analysis_ffmpeg_args(path, options)
+    if "-an" not in input_args:
+        input_args.append("-an")
+    cmd = input_args + [
+        "-vf",
+        f"{vf_prefix}select='gte(scene,0)',metadata=print:key=lavfi.scene_score",
+        "-f",
+        "null",
+        "-",
+    ]
+    parser = SceneScoreParser()
+
+    def on_line(line: str) -> None:
+        report_progress(line, progress)
+        parser.feed(line)
+
+    code, err_tail = stream_cmd(cmd, on_line)
+    if code != 0:
+        raise RuntimeError(f"ffmpeg scene scoring failed for {path}: {err_tail.strip()}")
+    return parser.times, parser.scores
+
+
+def threshold_scene_scores(times: array, scores: array, threshold: float) -> List[float]:
+    # Same semantics as select='gt(scene,threshold)'.
+    return sorted(set(t for t, score in zip(times, scores) if score > threshold and t > 0))
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "auto-editor")
+
+
+class AnalysisCache:
+    """SQLite store of ffprobe durations and scene times per source file.
+
+    Entries are keyed on absolute path, size and mtime plus the detection
+    variant (threshold etc.), and evicted least-recently-used once the
+    stored payload exceeds ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int) -> None:
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, "analysis.sqlite3")
+        self.max_bytes = max_bytes
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scenes ("
+                " path TEXT, size INTEGER, mtime_ns INTEGER, variant TEXT,"
+                " duration REAL, scene_times TEXT, nbytes INTEGER, last_used REAL,"
+                " PRIMARY KEY (path, size, mtime_ns, variant))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                " path TEXT, size INTEGER, mtime_ns INTEGER, variant TEXT,"
+                " duration REAL, times BLOB, scores BLOB, nbytes INTEGER, last_used REAL,"
+                " PRIMARY KEY (path, size, mtime_ns, variant))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call keeps the cache usable from
+        # the --jobs worker threads; callers close it with contextlib.closing
+        # (the connection's own context manager only commits).
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def _file_key(path: str) -> Tuple[str, int, int]:
+        st = os.stat(path)
+        return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+    def get(self, path: str, variant: str) -> Optional[Tuple[float, List[float]]]:
+        key = self._file_key(path) + (variant,)
+        with contextlib.closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT duration, scene_times FROM scenes"
+                " WHERE path=? AND size=? AND mtime_ns=? AND variant=?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE scenes SET last_used=?"
+                " WHERE path=? AND size=? AND mtime_ns=? AND variant=?",
+                (time.time(),) + key,
+            )
+        return float(row[0]), [float(t) for t in json.loads(row[1])]
+
+    def put(self, path: str, variant: str, duration: float, scene_times: List[float]) -> None:
+        key = self._file_key(path) + (variant,)
+        payload = json.dumps(scene_times)
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO scenes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                key + (duration, payload, len(payload), time.time()),
+            )
+            self._evict(conn)
+
+    def get_scores(self, path: str, variant: str) -> Optional[Tuple[float, array, array]]:
+        key = self._file_key(path) + (variant,)
+        with contextlib.closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT duration, times, scores FROM scores"
+                " WHERE path=? AND size=? AND mtime_ns=? AND variant=?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE scores SET last_used=?"
+                " WHERE path=? AND size=? AND mtime_ns=? AND variant=?",
+                (time.time(),) + key,
+            )
+        times = array("d")
+        times.frombytes(row[1])
+        scores = array("d")
+        scores.frombytes(row[2])
+        return float(row[0]), times, scores
+
+    def put_scores(
+        self, path: str, variant: str, duration: float, times: array, scores: array
+    ) -> None:
+        key = self._file_key(path) + (variant,)
+        times_blob = times.tobytes()
+        scores_blob = scores.tobytes()
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                key
+                + (
+                    duration,
+                    times_blob,
+                    scores_blob,
+                    len(times_blob) + len(scores_blob),
+                    time.time(),
+                ),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        tables = ("scenes", "scores")
+        total = sum(
+            conn.execute(f"SELECT COALESCE(SUM(nbytes), 0) FROM {table}").fetchone()[0]
+            for table in tables
+        )
+        if total <= self.max_bytes:
+            return
+        rows = []
+        for table in tables:
+            rows += [
+                (last_used, table, rowid, nbytes)
+                for rowid, nbytes, last_used in conn.execute(
+                    f"SELECT rowid, nbytes, last_used FROM {table}"
+                )
+            ]
+        for _, table, rowid, nbytes in sorted(rows):
+            if total <= self.max_bytes:
+                break
+            conn.execute(f"DELETE FROM {table} WHERE rowid=?", (rowid,))
+            total -= nbytes
+
+
+def open_analysis_cache(args: argparse.Namespace) -> Optional[AnalysisCache]:
+    if args.no_cache:
+        return None
+    return AnalysisCache(args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
 
 
 def build_segments(
@@ -120,8 +615,10 @@ def build_segments(
 def score_segments(
     segments: List[Segment], scene_times: List[float], style: str
 ) -> List[Segment]:
+    # Sorted once per source so each segment is two binary searches.
+    times = sorted(scene_times)
     for seg in segments:
-        scenes_in_seg = sum(1 for t in scene_times if seg.start <= t <= seg.end)
+        scenes_in_seg = bisect.bisect_right(times, seg.end) - bisect.bisect_left(times, seg.start)
         scene_rate = scenes_in_seg / max(seg.duration, 0.1)
         if style == "fast":
             seg.score = scene_rate + (1.0 / max(seg.duration, 1.0))
@@ -136,6 +633,140 @@ def score_segments(
     return segments
 
 
+class SharedState:
+    """Thread-safe memo of inputs shared by the jobs of one --batch run.
+
+    Each key is computed once; concurrent requests for the same key wait
+    for the first computation instead of repeating it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: dict = {}
+        self._key_locks: dict = {}
+
+    def get(self, key: Tuple, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._values:
+                    return self._values[key]
+            value = factory()
+            with self._lock:
+                self._values[key] = value
+            return value
+
+
+def memo_get(shared: Optional[SharedState], key: Tuple, factory: Callable[[], Any]) -> Any:
+    return shared.get(key, factory) if shared else factory()
+
+
+def analysis_progress(
+    source: str, duration: float, on_event: Optional[EventCallback] = None
+) -> ProgressCallback:
+    name = os.path.basename(source)
+    last = [-1]
+
+    def progress(current: float) -> None:
+        percent = int(min(100.0, 100.0 * current / duration)) if duration > 0 else 0
+        if percent != last[0]:
+            last[0] = percent
+            if on_event:
+                on_event(ProgressEvent("analyze", name, percent / 100.0))
+            else:
+                print(f"analyze {name}: {percent}%", file=sys.stderr, flush=True)
+
+    return progress
+
+
+def load_scene_times(
+    source: str,
+    args: argparse.Namespace,
+    cache: Optional[AnalysisCache] = None,
+    shared: Optional[SharedState] = None,
+    on_event: Optional[EventCallback] = None,
+) -> Tuple[float, List[float]]:
+    options = analysis_options_from_args(args)
+    if shared:
+        key = ("scenes", os.path.abspath(source), args.scene_threshold, args.scene_scores, options.variant())
+        return shared.get(key, lambda: load_scene_times(source, args, cache, None, on_event))
+    report = args.progress or on_event is not None
+    if args.scene_scores:
+        variant = f"scores:{options.variant()}"
+        cached_scores = cache.get_scores(source, variant) if cache else None
+        if cached_scores:
+            duration, times, scores = cached_scores
+        else:
+            duration = ffprobe_duration(source)
+            progress = analysis_progress(source, duration, on_event) if report else None
+            times, scores = extract_scene_scores(source, options, progress)
+            if cache:
+                cache.put_scores(source, variant, duration, times, scores)
+        return duration, threshold_scene_scores(times, scores, args.scene_threshold)
+
+    variant = f"scene>{args.scene_threshold}:{options.variant()}"
+    cached = cache.get(source, variant) if cache else None
+    if cached:
+        return cached
+    duration = ffprobe_duration(source)
+    progress = analysis_progress(source, duration, on_event) if report else None
+    scene_times = detect_scene_changes(source, args.scene_threshold, options, progress)
+    if cache:
+        cache.put(source, variant, duration, scene_times)
+    return duration, scene_times
+
+
+def analyze_source(
+    source: str,
+    args: argparse.Namespace,
+    cache: Optional[AnalysisCache] = None,
+    shared: Optional[SharedState] = None,
+    on_event: Optional[EventCallback] = None,
+) -> List[Segment]:
+    with timed_stage(f"analyze {os.path.basename(source)}"):
+        duration, scene_times = load_scene_times(source, args, cache, shared, on_event)
+        segments = build_segments(
+            source,
+            duration,
+            scene_times,
+            args.min_len,
+            args.max_len,
+            args.skip_start,
+            args.skip_end,
+        )
+        return score_segments(segments, scene_times, args.style)
+
+
+def analyze_sources(
+    sources: List[str],
+    args: argparse.Namespace,
+    shared: Optional[SharedState] = None,
+    on_event: Optional[EventCallback] = None,
+) -> List[Segment]:
+    for source in sources:
+        if not os.path.exists(source):
+            raise FileNotFoundError(source)
+    cache = memo_get(
+        shared, ("analysis_cache", args.no_cache, args.cache_dir), lambda: open_analysis_cache(args)
+    )
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    jobs = min(jobs, len(sources))
+    if jobs <= 1:
+        results = [analyze_source(source, args, cache, shared, on_event) for source in sources]
+    else:
+        # Each source is an independent ffmpeg decode; threads just wait on
+        # subprocesses. map() keeps results in input order.
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(lambda source: analyze_source(source, args, cache, shared, on_event), sources))
+    all_segments: List[Segment] = []
+    for segments in results:
+        all_segments.extend(segments)
+    return all_segments
+
+
 def pick_target_duration(target_min: float, target_max: float) -> float:
     target_min = max(10.0, target_min)
     target_max = max(target_min, target_max)
@@ -145,31 +776,129 @@ def pick_target_duration(target_min: float, target_max: float) -> float:
     return (target_min + target_max) / 2.0
 
 
+def knapsack_candidates(
+    items: List[Tuple[int, Segment]], cells: int
+) -> List[Tuple[int, Segment]]:
+    """Drop (width, segment) items that cannot be part of an optimal pick.
+
+    A feasible pick holds at most ``cells // min_width`` segments, so an item
+    with at least that many others no wider and no lower-scoring can always
+    be swapped out without loss.
+    """
+    if not items:
+        return []
+    max_items = cells // min(w for w, _ in items)
+    top_scores: List[float] = []
+    per_width: dict = {}
+    candidates = []
+    for w, seg in sorted(items, key=lambda item: (item[0], -item[1].score)):
+        if len(top_scores) >= max_items and top_scores[0] >= seg.score:
+            continue
+        if len(top_scores) >= max_items:
+            heapq.heapreplace(top_scores, seg.score)
+        else:
+            heapq.heappush(top_scores, seg.score)
+        if per_width.get(w, 0) < cells // w:
+            per_width[w] = per_width.get(w, 0) + 1
+            candidates.append((w, seg))
+    return candidates
+
+
+def knapsack_pick(candidates: List[Tuple[int, Segment]], cells: int) -> List[Segment]:
+    # best[c] = best total score using at most c cells. Each row is updated
+    # with whole-list map() calls; taken[i][c - w] records whether candidate
+    # i was used to reach cell c.
+    best = [0.0] * (cells + 1)
+    taken = []
+    for w, seg in candidates:
+        with_seg = [v + seg.score for v in best[: cells + 1 - w]]
+        without = best[w:]
+        taken.append(bytes(map(operator.gt, with_seg, without)))
+        best[w:] = list(map(max, with_seg, without))
+
+    picked = []
+    c = cells
+    for (w, seg), flags in zip(reversed(candidates), reversed(taken)):
+        if c >= w and flags[c - w]:
+            picked.append(seg)
+            c -= w
+    return picked
+
+
+def total_score(segments: List[Segment]) -> float:
+    return sum(seg.score for seg in segments)
+
+
+def greedy_pick(
+    segments: List[Segment], limit: float, stop_at: Optional[float] = None
+) -> List[Segment]:
+    """Highest score first, skipping segments that would pass ``limit``;
+    stops once ``stop_at`` seconds are reached."""
+    picked = []
+    total = 0.0
+    for seg in sorted(segments, key=lambda s: s.score, reverse=True):
+        if total + seg.duration > limit:
+            continue
+        picked.append(seg)
+        total += seg.duration
+        if stop_at is not None and total >= stop_at:
+            break
+    return picked
+
+
+def knapsack_select(
+    segments: List[Segment], capacity: float, max_cells: int = 2000, max_work: int = 1_000_000
+) -> List[Segment]:
+    """Pick the subset of ``segments`` with the highest total score whose
+    duration fits in ``capacity`` seconds (0/1 knapsack on a time grid).
+
+    The solve costs candidates x cells, so the grid starts at ``max_cells``
+    and is coarsened until that product is within ``max_work``. Durations
+    are rounded up to the grid; the slack this leaves is filled greedily
+    with the remaining segments at their real durations. The greedy fill
+    of ``capacity`` is the floor, so the result never scores below it and
+    never exceeds ``capacity``.
+    """
+    cells = max_cells
+    while True:
+        step = max(0.1, capacity / cells)
+        grid = int(capacity / step + 1e-9)
+        items = [(max(1, math.ceil(seg.duration / step - 1e-9)), seg) for seg in segments]
+        candidates = knapsack_candidates([item for item in items if item[0] <= grid], grid)
+        if len(candidates) * grid <= max_work or cells <= 100:
+            break
+        cells = max(100, min(cells // 2, max_work // len(candidates)))
+    picked = knapsack_pick(candidates, grid)
+    used = {id(seg) for seg in picked}
+    rest = [seg for seg in segments if id(seg) not in used]
+    picked += greedy_pick(rest, capacity - sum(seg.duration for seg in picked))
+    greedy = greedy_pick(segments, capacity)
+    return picked if total_score(picked) > total_score(greedy) else greedy
+
+
 def select_segments(
     segments: List[Segment],
     target_min: float,
     target_max: float,
     style: str,
     seed: int,
+    selector: str = "optimal",
 ) -> List[Segment]:
     if not segments:
         return []
     target = pick_target_duration(target_min, target_max)
-    random.seed(seed)
 
     if style in {"fast", "montage"}:
-        ranked = sorted(segments, key=lambda s: s.score, reverse=True)
-        picked = []
-        total = 0.0
-        for seg in ranked:
-            if total + seg.duration > target_max:
-                continue
-            picked.append(seg)
-            total += seg.duration
-            if total >= target:
-                break
-        picked = sorted(picked, key=lambda s: (s.source, s.start))
-        return picked
+        greedy = greedy_pick(segments, target_max, stop_at=target)
+        picked = greedy
+        if selector == "optimal":
+            # Greedy may run past target (up to target_max); the knapsack
+            # gets the same room, so it never scores below greedy.
+            capacity = min(target_max, max(target, sum(seg.duration for seg in greedy)))
+            optimal = knapsack_select(segments, capacity)
+            if total_score(optimal) >= total_score(greedy):
+                picked = optimal
+        return sorted(picked, key=lambda s: (s.source, s.start))
 
     # narration/tutorial: keep chronological order
     total = 0.0
@@ -192,6 +921,37 @@ def write_concat_file(segments: List[Segment], path: str) -> None:
             f.write(f"outpoint {seg.end:.3f}\n")
 
 
+AUDIO_ENCODER_ARGS = ["-c:a", "aac", "-b:a", "160k"]
+
+CONCAT_ENCODER_ARGS = [
+    "-c:v",
+    "libx264",
+    "-preset",
+    "veryfast",
+    "-crf",
+    "20",
+    *AUDIO_ENCODER_ARGS,
+]
+
+# ffprobe H.264 profile names -> libx264 -profile:v values.
+X264_PROFILES = {
+    "Constrained Baseline": "baseline",
+    "Baseline": "baseline",
+    "Main": "main",
+    "High": "high",
+    "High 10": "high10",
+    "High 4:2:2": "high422",
+    "High 4:4:4 Predictive": "high444",
+}
+
+
+def fit_filter(width: int, height: int) -> str:
+    return (
+        f"scale=w={width}:h={height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2"
+    )
+
+
 def run_concat(
     concat_path: str,
     output: str,
@@ -199,13 +959,15 @@ def run_concat(
     height: int,
     subtitle_path: Optional[str],
     subtitle_style: str,
+    mux: Optional[str] = None,
+    audio: bool = True,
 ) -> None:
-    vf = (
-        f"scale=w={width}:h={height}:force_original_aspect_ratio=decrease,"
-        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2"
-    )
+    vf = fit_filter(width, height)
     if subtitle_path:
         vf = f"{vf},subtitles='{subtitle_path}':force_style='{subtitle_style}'"
+    container = ["-f", mux] if mux else ["-movflags", "+faststart"]
+    if not audio:
+        container = ["-an", *container]
     cmd = [
         "ffmpeg",
         "-hide_banner",
@@ -218,18 +980,8 @@ def run_concat(
         concat_path,
         "-vf",
         vf,
-        "-c:v",
-        "libx264",
-        "-preset",
-        "veryfast",
-        "-crf",
-        "20",
-        "-c:a",
-        "aac",
-        "-b:a",
-        "160k",
-        "-movflags",
-        "+faststart",
+        *CONCAT_ENCODER_ARGS,
+        *container,
         output,
     ]
     code, _, err = run_cmd(cmd)
@@ -237,6 +989,479 @@ def run_concat(
         raise RuntimeError(f"ffmpeg concat failed: {err.strip()}")
 
 
+class SegmentRenderCache:
+    """Directory of encoded (video-only) MPEG-TS segments addressed by a hash
+    of their inputs.
+
+    File mtimes track last use; ``evict`` drops the least recently used
+    files once the directory exceeds ``max_bytes``. Paths returned by
+    ``lookup`` and ``store`` are pinned, and never evicted, until passed to
+    ``release``, so concurrent batch jobs sharing the cache keep their pieces.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int) -> None:
+        self.root = os.path.join(cache_dir, "segments")
+        os.makedirs(self.root, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._pins: dict = {}
+
+    @staticmethod
+    def key(
+        seg: Segment,
+        width: int,
+        height: int,
+        cues: List[Tuple[float, float, str]],
+        subtitle_style: str,
+    ) -> str:
+        st = os.stat(seg.source)
+        identity = {
+            "source": [os.path.abspath(seg.source), st.st_size, st.st_mtime_ns],
+            "span": [round(seg.start, 3), round(seg.end, 3)],
+            "filter": fit_filter(width, height),
+            "subtitles": [cues, subtitle_style] if cues else None,
+            "encoder": CONCAT_ENCODER_ARGS,
+            "audio": False,
+        }
+        blob = json.dumps(identity, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.ts")
+
+    def lookup(self, key: str) -> Optional[str]:
+        path = self.path(key)
+        with self._lock:
+            try:
+                os.utime(path)
+            except OSError:
+                return None
+            self._pins[path] = self._pins.get(path, 0) + 1
+        return path
+
+    def partial_path(self, key: str) -> str:
+        # Rendered inside the cache dir so store() is a same-filesystem rename.
+        return os.path.join(self.root, f"{key}.{os.getpid()}-{threading.get_ident()}.part")
+
+    def store(self, key: str, rendered: str) -> str:
+        path = self.path(key)
+        with self._lock:
+            os.replace(rendered, path)
+            self._pins[path] = self._pins.get(path, 0) + 1
+        return path
+
+    def release(self, paths: List[str]) -> None:
+        with self._lock:
+            for path in paths:
+                count = self._pins.get(path, 0) - 1
+                if count > 0:
+                    self._pins[path] = count
+                else:
+                    self._pins.pop(path, None)
+
+    def evict(self) -> None:
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.root):
+                if name.endswith(".part"):
+                    continue
+                path = os.path.join(self.root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path in self._pins:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+
+def open_render_cache(
+    args: argparse.Namespace, shared: Optional[SharedState] = None
+) -> Optional[SegmentRenderCache]:
+    if not args.render_cache:
+        return None
+    # One instance per directory within a batch, so pins are seen by every job.
+    return memo_get(
+        shared,
+        ("render_cache", os.path.abspath(args.cache_dir), args.render_cache_max_mb),
+        lambda: SegmentRenderCache(args.cache_dir, int(args.render_cache_max_mb * 1024 * 1024)),
+    )
+
+
+def group_segments(segments: List[Segment], chunk_seconds: float) -> List[List[Segment]]:
+    groups: List[List[Segment]] = []
+    current: List[Segment] = []
+    total = 0.0
+    for seg in segments:
+        current.append(seg)
+        total += seg.duration
+        if total >= chunk_seconds:
+            groups.append(current)
+            current = []
+            total = 0.0
+    if current:
+        groups.append(current)
+    return groups
+
+
+# Chunks whose probed start or length is further than this from the planned
+# one are re-encoded with their subtitles moved to the real timeline.
+SUBTITLE_DRIFT = 0.04
+
+
+def stream_fps(info: dict) -> Optional[float]:
+    """Frame rate of a probe_streams() video stream (ffprobe gives "num/den")."""
+    num, _, den = ((info.get("video") or {}).get("r_frame_rate") or "").partition("/")
+    try:
+        fps = float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return fps if fps > 0 else None
+
+
+def frame_length(seg: Segment, fps: Optional[float]) -> float:
+    """Length ``seg`` encodes to: its concat-file span in whole frames."""
+    span = round(seg.end, 3) - round(seg.start, 3)
+    return round(span * fps) / fps if fps else seg.duration
+
+
+def run_chunked_concat(
+    segments: List[Segment],
+    output: str,
+    width: int,
+    height: int,
+    cues: List[Tuple[float, float, str]],
+    subtitle_style: str,
+    chunk_seconds: float,
+    jobs: int,
+    workdir: str,
+    cache: Optional[SegmentRenderCache] = None,
+) -> None:
+    """Encode groups of segments in parallel ffmpeg processes, then join with -c copy.
+
+    Every chunk uses the run_concat filter chain and video encoder settings;
+    the audio is encoded once over the whole timeline (render_audio_track).
+    Subtitles are sliced at chunk offsets rounded to whole frames of the
+    first source, which is where an encoded chunk really starts; once the
+    chunks exist their durations are probed, and the rare chunk that still
+    landed elsewhere is re-encoded with its cues shifted to match.
+    With a render cache every segment is its own chunk and only segments
+    missing from the cache are encoded.
+    """
+    groups = [[seg] for seg in segments] if cache else group_segments(segments, chunk_seconds)
+    chunks: List[Optional[str]] = [None] * len(groups)
+    burned: List[list] = [[] for _ in groups]
+    # Cache entries this run uses; pinned until the join is done.
+    pinned: List[str] = []
+
+    def plan(idx: int, offset: float, length: float, tag: str) -> Optional[tuple]:
+        group = groups[idx]
+        chunk_cues = slice_cues(cues, offset, length) if cues else []
+        burned[idx] = chunk_cues
+        key = None
+        if cache:
+            key = cache.key(group[0], width, height, chunk_cues, subtitle_style)
+            cached = cache.lookup(key)
+            if cached:
+                pinned.append(cached)
+                chunks[idx] = cached
+                return None
+        concat_path = os.path.join(workdir, f"chunk_{idx:04d}.txt")
+        write_concat_file(group, concat_path)
+        subtitle_path = None
+        if chunk_cues:
+            srt_path = os.path.join(workdir, f"chunk_{idx:04d}{tag}.srt")
+            write_srt_cues(chunk_cues, srt_path)
+            subtitle_path = normalize_subtitle_path(srt_path)
+        chunk_path = os.path.join(workdir, f"chunk_{idx:04d}.ts")
+        return (idx, concat_path, chunk_path, subtitle_path, key)
+
+    def encode(task: Tuple[int, str, str, Optional[str], Optional[str]]) -> None:
+        slot, concat_path, chunk_path, subtitle_path, key = task
+        with timed_stage("encode chunk"):
+            if not (cache and key):
+                run_concat(
+                    concat_path, chunk_path, width, height, subtitle_path, subtitle_style, "mpegts", False
+                )
+                chunks[slot] = chunk_path
+                return
+            partial = cache.partial_path(key)
+            try:
+                run_concat(
+                    concat_path, partial, width, height, subtitle_path, subtitle_style, "mpegts", False
+                )
+                chunks[slot] = cache.store(key, partial)
+                pinned.append(chunks[slot])
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+
+    def encode_all(tasks: list) -> None:
+        tasks = [task for task in tasks if task]
+        if tasks:
+            with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(tasks)))) as pool:
+                list(pool.map(encode, tasks))
+
+    try:
+        first = probe_streams(segments[0].source)
+        fps = stream_fps(first)
+        lengths = [sum(frame_length(seg, fps) for seg in group) for group in groups]
+        tasks = []
+        offset = 0.0
+        for idx, length in enumerate(lengths):
+            tasks.append(plan(idx, offset, length, ""))
+            offset += length
+        encode_all(tasks)
+
+        if cues:
+            # Sources with another frame rate or odd timestamps can still end a
+            # chunk off the planned frame; only those chunks are encoded again.
+            with timed_stage("probe chunks"):
+                durations = [ffprobe_duration(chunk) for chunk in chunks]
+            tasks = []
+            planned = 0.0
+            actual = 0.0
+            for idx, length in enumerate(lengths):
+                drifted = max(abs(actual - planned), abs(durations[idx] - length)) > SUBTITLE_DRIFT
+                if drifted and (burned[idx] or slice_cues(cues, actual, durations[idx])):
+                    tasks.append(plan(idx, actual, durations[idx], "_shifted"))
+                planned += length
+                actual += durations[idx]
+            encode_all(tasks)
+
+        audio = None
+        if first.get("audio"):
+            # The concat demuxer takes its stream layout from the first file.
+            audio = os.path.join(workdir, "audio.m4a")
+            with timed_stage("encode audio"):
+                render_audio_track(segments, audio, workdir)
+        join_pieces([chunk for chunk in chunks if chunk], output, workdir, audio)
+    finally:
+        if cache:
+            cache.release(pinned)
+    if cache:
+        cache.evict()
+
+
+def probe_streams(path: str) -> dict:
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "stream=codec_type,codec_name,profile,level,width,height,pix_fmt,r_frame_rate,sample_rate,channels",
+        "-of",
+        "json",
+        path,
+    ]
+    code, out, err = run_cmd(cmd)
+    if code != 0:
+        raise RuntimeError(f"ffprobe failed for {path}: {err.strip()}")
+    info: dict = {}
+    for stream in json.loads(out).get("streams", []):
+        kind = stream.get("codec_type")
+        if kind in ("video", "audio") and kind not in info:
+            info[kind] = stream
+    return info
+
+
+def smart_render_profile(sources: List[str], width: int, height: int) -> Optional[dict]:
+    """Return the shared stream layout if every source can be stream-copied.
+
+    All sources must be H.264 at exactly ``width`` x ``height`` with the same
+    profile, level, pixel format and frame rate, so re-encoded pieces can be
+    made to match the copied ones. Audio is re-encoded as one track, so it
+    only has to share codec and layout (or be absent everywhere).
+    """
+    profile = None
+    for source in sorted(set(sources)):
+        info = probe_streams(source)
+        video = info.get("video")
+        audio = info.get("audio")
+        if not video or video.get("codec_name") != "h264":
+            return None
+        if video.get("width") != width or video.get("height") != height:
+            return None
+        if video.get("profile") not in X264_PROFILES or not video.get("level"):
+            return None
+        current = {
+            "profile": X264_PROFILES[video["profile"]],
+            "level": video["level"],
+            "pix_fmt": video.get("pix_fmt"),
+            "fps": video.get("r_frame_rate"),
+            "audio": (
+                (audio.get("codec_name"), audio.get("sample_rate"), audio.get("channels"))
+                if audio
+                else None
+            ),
+        }
+        if profile is None:
+            profile = current
+        elif current != profile:
+            return None
+    return profile
+
+
+def probe_keyframes(path: str) -> List[float]:
+    # Packet flags come from the container index, so no decoding is needed.
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "packet=pts_time,flags",
+        "-of",
+        "csv=p=0",
+        path,
+    ]
+    code, out, err = run_cmd(cmd)
+    if code != 0:
+        raise RuntimeError(f"ffprobe failed for {path}: {err.strip()}")
+    keyframes = []
+    for line in out.splitlines():
+        parts = line.split(",")
+        if len(parts) < 2 or "K" not in parts[1]:
+            continue
+        try:
+            keyframes.append(float(parts[0]))
+        except ValueError:
+            continue
+    return sorted(keyframes)
+
+
+def split_segment_on_keyframes(
+    seg: Segment, keyframes: List[float], min_copy: float = 1.0
+) -> List[Tuple[str, float, float]]:
+    """Split ``seg`` into ("encode" | "copy", start, end) pieces.
+
+    The GOP-aligned middle is copied; the partial GOPs before the first and
+    after the last keyframe inside the segment are re-encoded.
+    """
+    inside = [k for k in keyframes if seg.start <= k <= seg.end]
+    if len(inside) < 2 or inside[-1] - inside[0] < min_copy:
+        return [("encode", seg.start, seg.end)]
+    first, last = inside[0], inside[-1]
+    pieces = []
+    if first - seg.start > 0.001:
+        pieces.append(("encode", seg.start, first))
+    pieces.append(("copy", first, last))
+    if seg.end - last > 0.001:
+        pieces.append(("encode", last, seg.end))
+    return pieces
+
+
+def render_piece(
+    kind: str, source: str, start: float, end: float, profile: dict, path: str
+) -> None:
+    # MPEG-TS pieces carry SPS/PPS in-band, so copied and re-encoded H.264
+    # can be joined without re-encoding. Pieces are video only; the audio is
+    # encoded once for the whole timeline (render_audio_track).
+    if kind == "copy":
+        # Input seeking with -c copy lands on the keyframe at or before -ss;
+        # nudge past float rounding so it is the intended one.
+        cmd = ["ffmpeg", "-hide_banner", "-y", "-ss", f"{start + 0.001:.3f}", "-i", source]
+        cmd += ["-t", f"{end - start:.3f}", "-map", "0:v:0", "-an"]
+        cmd += ["-c", "copy", "-avoid_negative_ts", "make_zero", "-f", "mpegts", path]
+    else:
+        cmd = ["ffmpeg", "-hide_banner", "-y", "-ss", f"{start:.3f}", "-i", source]
+        cmd += ["-t", f"{end - start:.3f}", "-map", "0:v:0", "-an"]
+        cmd += [
+            "-c:v",
+            "libx264",
+            "-preset",
+            "veryfast",
+            "-crf",
+            "20",
+            "-profile:v",
+            profile["profile"],
+            "-level:v",
+            f"{profile['level'] / 10:.1f}",
+            "-pix_fmt",
+            profile["pix_fmt"],
+            "-r",
+            profile["fps"],
+        ]
+        cmd += ["-f", "mpegts", path]
+    code, _, err = run_cmd(cmd)
+    if code != 0:
+        raise RuntimeError(f"ffmpeg {kind} piece failed: {err.strip()}")
+
+
+def render_audio_track(segments: List[Segment], path: str, workdir: str) -> None:
+    """Encode the audio of ``segments`` as one continuous AAC stream.
+
+    Encoding per piece would add AAC priming and padding at every joint.
+    """
+    concat_path = os.path.join(workdir, "audio.txt")
+    write_concat_file(segments, concat_path)
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-y",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        concat_path,
+        "-vn",
+        *AUDIO_ENCODER_ARGS,
+        path,
+    ]
+    code, _, err = run_cmd(cmd)
+    if code != 0:
+        raise RuntimeError(f"ffmpeg audio track failed: {err.strip()}")
+
+
+def join_pieces(
+    pieces: List[str], output: str, workdir: str, audio: Optional[str] = None
+) -> None:
+    """Join MPEG-TS pieces with -c copy; ``audio`` replaces their audio."""
+    list_path = os.path.join(workdir, "pieces.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for piece in pieces:
+            f.write(f"file '{normalize_concat_path(piece)}'\n")
+    cmd = ["ffmpeg", "-hide_banner", "-y", "-f", "concat", "-safe", "0", "-i", list_path]
+    if audio:
+        cmd += ["-i", audio, "-map", "0:v:0", "-map", "1:a:0", "-c", "copy"]
+    else:
+        cmd += ["-c", "copy", "-bsf:a", "aac_adtstoasc"]
+    cmd += ["-movflags", "+faststart", output]
+    code, _, err = run_cmd(cmd)
+    if code != 0:
+        raise RuntimeError(f"ffmpeg join failed: {err.strip()}")
+
+
+def run_smart_concat(
+    segments: List[Segment], output: str, profile: dict, workdir: str
+) -> None:
+    keyframes = {source: probe_keyframes(source) for source in set(s.source for s in segments)}
+    pieces = []
+    for seg_idx, seg in enumerate(segments):
+        for piece_idx, (kind, start, end) in enumerate(
+            split_segment_on_keyframes(seg, keyframes[seg.source])
+        ):
+            path = os.path.join(workdir, f"piece_{seg_idx:04d}_{piece_idx}.ts")
+            render_piece(kind, seg.source, start, end, profile, path)
+            pieces.append(path)
+    audio = None
+    if profile["audio"]:
+        audio = os.path.join(workdir, "audio.m4a")
+        render_audio_track(segments, audio, workdir)
+    join_pieces(pieces, output, workdir, audio)
+
+
 def run_script_video(
     output: str,
     width: int,
@@ -361,7 +1586,7 @@ def run_script_video(
         raise RuntimeError(f"ffmpeg script video failed: {err.strip()}")
 
 
-def parse_args() -> argparse.Namespace:
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Auto editor: generate 16:9 edits in multiple styles."
     )
@@ -369,19 +1594,50 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--style", choices=["fast", "narration", "tutorial", "montage"], default="fast")
     parser.add_argument("--target-min", type=float, default=60, help="Min target duration (seconds)")
     parser.add_argument("--target-max", type=float, default=300, help="Max target duration (seconds)")
+    parser.add_argument(
+        "--selector",
+        choices=["optimal", "greedy"],
+        default="optimal",
+        help="fast/montage segment picker: optimal = max total score within target (knapsack)",
+    )
     parser.add_argument("--resolution", default="1920x1080", help="Output resolution WxH")
     parser.add_argument("--scene-threshold", type=float, default=0.3, help="Scene detect threshold")
+    parser.add_argument(
+        "--analysis-mode",
+        choices=["full", "fast"],
+        default="full",
+        help="Scene analysis decode mode (fast = downscaled proxy)",
+    )
+    parser.add_argument("--analysis-width", type=int, default=320, help="Proxy width for fast analysis")
+    parser.add_argument("--analysis-fps", type=float, default=0.0, help="Resample fps for fast analysis (0 = source)")
+    parser.add_argument("--keyframes-only", action="store_true", help="Decode only keyframes in fast analysis")
+    parser.add_argument("--analysis-threads", type=int, default=0, help="ffmpeg decode threads (0 = auto)")
+    parser.add_argument(
+        "--scene-scores",
+        action="store_true",
+        help="Record per-frame scene scores once and threshold them in Python",
+    )
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Scene analysis cache directory")
+    parser.add_argument("--cache-max-mb", type=float, default=256, help="Max analysis cache size (MB)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the scene analysis cache")
     parser.add_argument("--min-len", type=float, default=2.0, help="Min segment length")
     parser.add_argument("--max-len", type=float, default=12.0, help="Max segment length")
     parser.add_argument("--skip-start", type=float, default=2.0, help="Skip at start (seconds)")
     parser.add_argument("--skip-end", type=float, default=2.0, help="Skip at end (seconds)")
     parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--jobs", type=int, default=1, help="Parallel workers for analysis and chunked render (0 = CPU count)")
     parser.add_argument("--script", help="Text script file path for subtitles")
     parser.add_argument("--tts", action="store_true", help="Generate TTS audio from script (Windows)")
     parser.add_argument("--voice", help="TTS voice name (Windows)")
     parser.add_argument("--bg-color", default="black", help="Background color for script-only")
     parser.add_argument("--bg-image", help="Background image for script-only")
     parser.add_argument("--bg-dir", help="Background image directory for script-only")
+    parser.add_argument(
+        "--image-catalog",
+        nargs="?",
+        const=os.path.join(DEFAULT_CACHE_DIR, "images.sqlite3"),
+        help="SQLite catalog of --bg-dir; only directories whose mtime changed are rescanned",
+    )
     parser.add_argument("--bgm", help="Background music file or directory")
     parser.add_argument("--bgm-volume", type=float, default=0.3, help="BGM volume (0-1)")
     parser.add_argument("--voice-volume", type=float, default=1.0, help="TTS volume (0-1)")
@@ -389,6 +1645,10 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--category-map", help="JSON category map for image matching")
     parser.add_argument("--category-boost", type=float, default=2.0, help="Boost if image path hits category")
     parser.add_argument("--image-tags", help="JSON mapping image file -> tags list")
+    parser.add_argument(
+        "--image-index",
+        help="Image index JSON path; reused when images and tags are unchanged, else rebuilt and saved",
+    )
     parser.add_argument("--tag-boost", type=float, default=2.0, help="Boost if image tags hit keyword")
     parser.add_argument("--auto-tag", action="store_true", help="Auto-generate image tags from paths")
     parser.add_argument("--auto-tag-out", default="image-tags.auto.json", help="Auto tag output JSON path")
@@ -405,9 +1665,65 @@ def parse_args() -> argparse.Namespace:
         default=22,
         help="Max characters per subtitle line",
     )
+    parser.add_argument(
+        "--render-mode",
+        choices=["encode", "smart", "chunked"],
+        default="encode",
+        help=(
+            "encode = single re-encode pass; smart = stream-copy whole GOPs when sources match; "
+            "chunked = encode segment groups in parallel (--jobs) and join"
+        ),
+    )
+    parser.add_argument("--chunk-seconds", type=float, default=30.0, help="Target chunk length for chunked render")
+    parser.add_argument(
+        "--render-cache",
+        action="store_true",
+        help=(
+            "Reuse encoded segments from --cache-dir; only new segments are encoded "
+            "(renders chunked; not combinable with --render-mode smart)"
+        ),
+    )
+    parser.add_argument("--render-cache-max-mb", type=float, default=2048, help="Max rendered segment cache size (MB)")
+    parser.add_argument("--progress", action="store_true", help="Print scene analysis progress to stderr")
+    parser.add_argument("--profile", action="store_true", help="Print per-stage/ffmpeg timings to stderr at exit")
+    parser.add_argument("--timings-json", help="Write wall/CPU time and peak RSS per stage and subprocess to this JSON file")
+    parser.add_argument("--cprofile-dir", help="Run each top-level stage under cProfile and dump .prof stats here")
+    parser.add_argument("--batch", help="JSONL file, one job per line (CLI option names as keys)")
+    parser.add_argument("--batch-workers", type=int, default=2, help="Batch jobs rendered concurrently (0 = CPU count)")
     parser.add_argument("--dry-run", action="store_true", help="Only print selected segments")
     parser.add_argument("--output", default="output.mp4", help="Output path")
-    return parser.parse_args()
+    return parser
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    return build_parser().parse_args(argv)
+
+
+# Options that drive the whole process (batch mode, profiling) rather than
+# one render; main() handles them and RenderConfig leaves them out.
+CLI_ONLY_OPTIONS = {"batch", "batch_workers", "profile", "timings_json", "cprofile_dir"}
+
+
+def config_field_type(action: argparse.Action) -> Any:
+    if action.nargs == 0:
+        return bool
+    if action.nargs in ("*", "+"):
+        return Optional[List[str]]
+    kind = action.type or str
+    return kind if action.default is not None else Optional[kind]
+
+
+# One field per per-render CLI option, typed and defaulted from the parser,
+# so the library API and the command line cannot drift apart.
+RenderConfig = make_dataclass(
+    "RenderConfig",
+    [
+        (action.dest, config_field_type(action), field(default=action.default))
+        for action in build_parser()._actions
+        if action.option_strings and action.dest not in CLI_ONLY_OPTIONS | {"help"}
+    ],
+)
+RenderConfig.__doc__ = "Options for render_edit / render_script_video; mirrors parse_args()."
 
 
 def style_defaults(args: argparse.Namespace) -> None:
@@ -513,18 +1829,41 @@ def compute_line_durations(
     return raw, total_raw
 
 
-def write_srt_with_durations(lines: List[str], durations: List[float], path: str) -> None:
+def subtitle_cues(lines: List[str], durations: List[float]) -> List[Tuple[float, float, str]]:
     if not lines or not durations or len(lines) != len(durations):
         raise RuntimeError("Subtitle lines and durations mismatch.")
+    cues = []
     current = 0.0
+    for line, dur in zip(lines, durations):
+        end = current + max(0.2, dur)
+        cues.append((current, end, line))
+        current = end
+    return cues
+
+
+def slice_cues(
+    cues: List[Tuple[float, float, str]], offset: float, length: float
+) -> List[Tuple[float, float, str]]:
+    """Cues overlapping [offset, offset + length], clipped and shifted to start at 0."""
+    sliced = []
+    for start, end, line in cues:
+        if end <= offset or start >= offset + length:
+            continue
+        sliced.append((max(0.0, start - offset), min(length, end - offset), line))
+    return sliced
+
+
+def write_srt_cues(cues: List[Tuple[float, float, str]], path: str) -> bool:
     with open(path, "w", encoding="utf-8") as f:
-        for idx, (line, dur) in enumerate(zip(lines, durations), start=1):
-            start = current
-            end = current + max(0.2, dur)
+        for idx, (start, end, line) in enumerate(cues, start=1):
             f.write(f"{idx}\n")
             f.write(f"{seconds_to_srt_time(start)} --> {seconds_to_srt_time(end)}\n")
             f.write(f"{line}\n\n")
-            current = end
+    return bool(cues)
+
+
+def write_srt_with_durations(lines: List[str], durations: List[float], path: str) -> None:
+    write_srt_cues(subtitle_cues(lines, durations), path)
 
 
 def generate_tts_wav(script_text: str, output_path: str, voice: Optional[str]) -> None:
@@ -552,15 +1891,123 @@ def generate_tts_wav(script_text: str, output_path: str, voice: Optional[str]) -
         raise RuntimeError(f"TTS generation failed: {err.strip()}")
 
 
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+
+
 def collect_images(bg_dir: str) -> List[str]:
     images = []
     for root, _, files in os.walk(bg_dir):
         for name in files:
-            if name.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
+            if name.lower().endswith(IMAGE_EXTS):
                 images.append(os.path.join(root, name))
     return images
 
 
+class ImageCatalog:
+    """Incremental SQLite catalog of image libraries.
+
+    Each directory is stored with its mtime and subdirectories, each image
+    with its file-name tokens, both in directory listing order. A rescan
+    lists only directories whose mtime changed (files added, removed or
+    renamed); unchanged ones are answered from the catalog.
+    """
+
+    SCHEMA = 2
+
+    def __init__(self, db_path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        with contextlib.closing(self._connect()) as conn, conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA:
+                # Only a cache of the file system, so older layouts are rebuilt.
+                conn.execute("DROP TABLE IF EXISTS dirs")
+                conn.execute("DROP TABLE IF EXISTS images")
+                conn.execute(f"PRAGMA user_version = {self.SCHEMA}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dirs ("
+                " path TEXT PRIMARY KEY, mtime_ns INTEGER, subdirs TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                " path TEXT PRIMARY KEY, dir TEXT, seq INTEGER, name TEXT, tokens TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS images_dir ON images (dir)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def scan(self, bg_dir: str) -> Tuple[List[str], List[List[str]]]:
+        """Return image paths under ``bg_dir`` exactly as collect_images
+        would (same spelling and os.walk order) and the tokenize_path tokens
+        of each."""
+        root = os.path.abspath(bg_dir)
+        root_tokens = tokenize_path(bg_dir)
+        images: List[str] = []
+        path_tokens: List[List[str]] = []
+        seen = set()
+        with contextlib.closing(self._connect()) as conn, conn:
+            known = {
+                path: (mtime_ns, json.loads(subdirs))
+                for path, mtime_ns, subdirs in conn.execute("SELECT path, mtime_ns, subdirs FROM dirs")
+            }
+            # Depth-first, parents before children, subdirectories in listing
+            # order: the order os.walk visits them.
+            stack = [""]
+            while stack:
+                rel_dir = stack.pop()
+                abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+                try:
+                    mtime_ns = os.stat(abs_dir).st_mtime_ns
+                except OSError:
+                    continue
+                seen.add(abs_dir)
+                entry = known.get(abs_dir)
+                if entry and entry[0] == mtime_ns:
+                    subdirs = entry[1]
+                else:
+                    subdirs = self._rescan_dir(conn, abs_dir, mtime_ns)
+                dir_tokens = root_tokens + tokenize_path(rel_dir)
+                for name, tokens in conn.execute(
+                    "SELECT name, tokens FROM images WHERE dir=? ORDER BY seq", (abs_dir,)
+                ):
+                    images.append(os.path.join(bg_dir, rel_dir, name))
+                    path_tokens.append(dir_tokens + json.loads(tokens))
+                stack.extend(os.path.join(rel_dir, sub) for sub in reversed(subdirs))
+            prefix = root + os.sep
+            for path in known:
+                if (path == root or path.startswith(prefix)) and path not in seen:
+                    conn.execute("DELETE FROM dirs WHERE path=?", (path,))
+                    conn.execute("DELETE FROM images WHERE dir=?", (path,))
+        return images, path_tokens
+
+    @staticmethod
+    def _rescan_dir(conn: sqlite3.Connection, abs_dir: str, mtime_ns: int) -> List[str]:
+        # Classified like os.walk: symlinked directories are neither walked
+        # nor taken as images; any other entry with an image extension is.
+        subdirs = []
+        rows = []
+        with os.scandir(abs_dir) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.name.lower().endswith(IMAGE_EXTS) and not entry.is_dir():
+                    rows.append(
+                        (
+                            entry.path,
+                            abs_dir,
+                            len(rows),
+                            entry.name,
+                            json.dumps(tokenize_path(entry.name)),
+                        )
+                    )
+        conn.execute("DELETE FROM images WHERE dir=?", (abs_dir,))
+        conn.executemany("INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?)", rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)", (abs_dir, mtime_ns, json.dumps(subdirs))
+        )
+        return subdirs
+
+
 def extract_keywords(line: str) -> List[str]:
     tokens = re.findall(r"[A-Za-z0-9\u4e00-\u9fff]+", line)
     return [t for t in tokens if len(t) >= 2]
@@ -571,10 +2018,12 @@ def tokenize_path(path: str) -> List[str]:
     return [p for p in parts if p]
 
 
-def auto_generate_image_tags(images: List[str], min_len: int) -> dict:
+def auto_generate_image_tags(
+    images: List[str], min_len: int, path_tokens: Optional[List[List[str]]] = None
+) -> dict:
     tags = {}
-    for img in images:
-        tokens = tokenize_path(img)
+    for i, img in enumerate(images):
+        tokens = path_tokens[i] if path_tokens is not None else tokenize_path(img)
         cleaned = [t for t in tokens if len(t) >= min_len]
         key = os.path.basename(img).lower()
         if key not in tags:
@@ -679,6 +2128,115 @@ def match_categories(
     return list(categories)
 
 
+class ImageIndex:
+    """Inverted index from path tokens and image tags to image positions.
+
+    Built once per run so matching a script line only touches images that
+    share a keyword with it, instead of re-tokenizing the whole library.
+    """
+
+    def __init__(self, images: List[str], tokens: dict, tags: dict, fingerprint: str) -> None:
+        self.images = images
+        self.tokens = tokens
+        self.tags = tags
+        self.fingerprint = fingerprint
+
+    @staticmethod
+    def fingerprint_for(images: List[str], image_tags: dict) -> str:
+        blob = json.dumps([images, image_tags], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def build(
+        cls, images: List[str], image_tags: dict, path_tokens: Optional[List[List[str]]] = None
+    ) -> "ImageIndex":
+        tokens: dict = {}
+        tags: dict = {}
+        for idx, img in enumerate(images):
+            img_tokens = path_tokens[idx] if path_tokens is not None else tokenize_path(img)
+            for token in set(img_tokens):
+                tokens.setdefault(token, []).append(idx)
+            for tag in set(image_tags.get(os.path.basename(img).lower(), [])):
+                tags.setdefault(tag, []).append(idx)
+        return cls(images, tokens, tags, cls.fingerprint_for(images, image_tags))
+
+    def save(self, path: str) -> None:
+        data = {
+            "fingerprint": self.fingerprint,
+            "images": self.images,
+            "tokens": self.tokens,
+            "tags": self.tags,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "ImageIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise RuntimeError("image index must be a JSON object.")
+        return cls(data["images"], data["tokens"], data["tags"], data["fingerprint"])
+
+    def pick(
+        self,
+        line: str,
+        seed: int,
+        keyword_dict: dict,
+        category_map: dict,
+        category_boost: float,
+        tag_boost: float,
+    ) -> str:
+        images = self.images
+        if not images:
+            raise RuntimeError("No images found in bg directory.")
+        keywords = extract_keywords(line)
+        expanded = expand_keywords(keywords, keyword_dict)
+        categories = match_categories(keywords, category_map, expanded)
+        if not expanded:
+            return random.Random(seed).choice(images)
+        # Same accumulation order per image as a full scan: path keywords,
+        # path categories, tag keywords, tag categories.
+        scores: dict = {}
+        for kw, weight, _ in expanded:
+            for idx in self.tokens.get(kw, ()):
+                scores[idx] = scores.get(idx, 0.0) + weight
+        for cat in categories:
+            for idx in self.tokens.get(cat, ()):
+                scores[idx] = scores.get(idx, 0.0) + category_boost
+        for kw, weight, _ in expanded:
+            for idx in self.tags.get(kw, ()):
+                scores[idx] = scores.get(idx, 0.0) + max(weight, tag_boost)
+        for cat in categories:
+            for idx in self.tags.get(cat, ()):
+                scores[idx] = scores.get(idx, 0.0) + category_boost
+        # Images sharing no keyword score 0; ties go to the earliest image.
+        best_score = max(scores.values(), default=0.0)
+        if len(scores) < len(images):
+            best_score = max(best_score, 0.0)
+        if best_score == 0:
+            return random.Random(seed).choice(images)
+        return images[min(idx for idx, score in scores.items() if score == best_score)]
+
+
+def load_or_build_image_index(
+    images: List[str],
+    image_tags: dict,
+    path: Optional[str],
+    path_tokens: Optional[List[List[str]]] = None,
+) -> ImageIndex:
+    """Reuse the index at ``path`` if it matches ``images`` and ``image_tags``."""
+    fingerprint = ImageIndex.fingerprint_for(images, image_tags)
+    if path and os.path.exists(path):
+        index = ImageIndex.load(path)
+        if index.fingerprint == fingerprint:
+            return index
+    index = ImageIndex.build(images, image_tags, path_tokens)
+    if path:
+        index.save(path)
+    return index
+
+
 def pick_image_for_line(
     images: List[str],
     line: str,
@@ -688,40 +2246,11 @@ def pick_image_for_line(
     category_boost: float,
     image_tags: dict,
     tag_boost: float,
+    index: Optional[ImageIndex] = None,
 ) -> str:
-    if not images:
-        raise RuntimeError("No images found in bg directory.")
-    keywords = extract_keywords(line)
-    expanded = expand_keywords(keywords, keyword_dict)
-    categories = match_categories(keywords, category_map, expanded)
-    if not expanded:
-        random.seed(seed)
-        return random.choice(images)
-    scored = []
-    for img in images:
-        tokens = tokenize_path(img)
-        score = 0.0
-        for kw, weight, _ in expanded:
-            if kw in tokens:
-                score += weight
-        for cat in categories:
-            if cat in tokens:
-                score += category_boost
-        img_key = os.path.basename(img).lower()
-        tags = image_tags.get(img_key, [])
-        if tags:
-            for kw, weight, _ in expanded:
-                if kw in tags:
-                    score += max(weight, tag_boost)
-            for cat in categories:
-                if cat in tags:
-                    score += category_boost
-        scored.append((score, img))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    if scored[0][0] == 0:
-        random.seed(seed)
-        return random.choice(images)
-    return scored[0][1]
+    if index is None:
+        index = ImageIndex.build(images, image_tags)
+    return index.pick(line, seed, keyword_dict, category_map, category_boost, tag_boost)
 
 
 def normalize_concat_path(path: str) -> str:
@@ -739,9 +2268,12 @@ def write_image_concat_file(
     category_boost: float,
     image_tags: dict,
     tag_boost: float,
+    index: Optional[ImageIndex] = None,
 ) -> None:
     if not lines or not durations:
         raise RuntimeError("No script lines to map images.")
+    if index is None:
+        index = ImageIndex.build(images, image_tags)
     with open(path, "w", encoding="utf-8") as f:
         for idx, (line, dur) in enumerate(zip(lines, durations)):
             img = pick_image_for_line(
@@ -753,6 +2285,7 @@ def write_image_concat_file(
                 category_boost,
                 image_tags,
                 tag_boost,
+                index,
             )
             f.write(f"file '{normalize_concat_path(img)}'\n")
             f.write(f"duration {max(0.2, dur):.3f}\n")
@@ -766,6 +2299,7 @@ def write_image_concat_file(
             category_boost,
             image_tags,
             tag_boost,
+            index,
         )
         f.write(f"file '{normalize_concat_path(last_img)}'\n")
 
@@ -779,26 +2313,75 @@ def pick_bgm(bgm_path: str, seed: int) -> str:
                     audio_files.append(os.path.join(root, name))
         if not audio_files:
             raise RuntimeError("No audio files found in bgm directory.")
-        random.seed(seed)
-        return random.choice(audio_files)
+        return random.Random(seed).choice(audio_files)
     return bgm_path
 
 
-def main() -> int:
-    args = parse_args()
+def prepare_image_matching(
+    args: argparse.Namespace, shared: Optional[SharedState] = None
+) -> Tuple[List[str], dict, dict, dict, ImageIndex]:
+    """Load images, dictionaries, tags and the image index for --bg-dir."""
+
+    def scan() -> Tuple[List[str], Optional[List[List[str]]]]:
+        if args.image_catalog:
+            return ImageCatalog(args.image_catalog).scan(args.bg_dir)
+        return collect_images(args.bg_dir), None
+
+    images, path_tokens = memo_get(shared, ("images", args.bg_dir, args.image_catalog), scan)
+    keyword_dict = memo_get(
+        shared, ("keyword_dict", args.keyword_dict), lambda: load_keyword_dict(args.keyword_dict)
+    )
+    category_map = memo_get(
+        shared, ("category_map", args.category_map), lambda: load_category_map(args.category_map)
+    )
+
+    def tags_and_index() -> Tuple[dict, ImageIndex]:
+        image_tags = load_image_tags(args.image_tags)
+        if args.auto_tag:
+            auto_tags = auto_generate_image_tags(images, args.auto_tag_min_len, path_tokens)
+            image_tags = merge_image_tags(image_tags, auto_tags)
+            with open(args.auto_tag_out, "w", encoding="utf-8") as f:
+                json.dump(image_tags, f, ensure_ascii=False, indent=2)
+        index = load_or_build_image_index(images, image_tags, args.image_index, path_tokens)
+        return image_tags, index
+
+    key = (
+        "image_index",
+        args.bg_dir,
+        args.image_catalog,
+        args.image_tags,
+        args.auto_tag and (args.auto_tag_min_len, args.auto_tag_out),
+        args.image_index,
+    )
+    image_tags, index = memo_get(shared, key, tags_and_index)
+    return images, keyword_dict, category_map, image_tags, index
+
+
+def run_job(
+    args: argparse.Namespace,
+    shared: Optional[SharedState] = None,
+    on_event: Optional[EventCallback] = None,
+) -> RenderResult:
+    def emit(stage: str, message: str, fraction: Optional[float] = None) -> None:
+        if on_event:
+            on_event(ProgressEvent(stage, message, fraction))
+
     style_defaults(args)
     width, height = [int(x) for x in args.resolution.lower().split("x")]
+    if args.render_cache and args.render_mode == "smart":
+        raise RuntimeError("--render-cache cannot be combined with --render-mode smart.")
 
     if not args.input:
         if not args.script:
             raise RuntimeError("Script-only mode requires --script.")
-        script_text = read_text_file(args.script)
-        lines = split_script(script_text, args.subtitle_max_len)
-        durations, total_duration = compute_line_durations(lines, args.cps)
+        with timed_stage("script"):
+            script_text = read_text_file(args.script)
+            lines = split_script(script_text, args.subtitle_max_len)
+            durations, total_duration = compute_line_durations(lines, args.cps)
         if args.dry_run:
             for line, dur in zip(lines, durations):
                 print(f"{dur:.2f}s: {line}")
-            return 0
+            return RenderResult(args.output, total_duration, lines=lines, dry_run=True)
         with tempfile.TemporaryDirectory() as tmpdir:
             srt_path = os.path.join(tmpdir, "subtitles.srt")
             write_srt_with_durations(lines, durations, srt_path)
@@ -807,93 +2390,236 @@ def main() -> int:
             bgm_path = None
             if args.tts:
                 audio_path = os.path.join(tmpdir, "tts.wav")
-                generate_tts_wav(script_text, audio_path, args.voice)
+                with timed_stage("tts"):
+                    generate_tts_wav(script_text, audio_path, args.voice)
             if args.bgm:
                 bgm_path = pick_bgm(args.bgm, args.seed)
             image_concat = None
             if args.bg_dir:
-                images = collect_images(args.bg_dir)
-                image_concat = os.path.join(tmpdir, "images.txt")
-                keyword_dict = load_keyword_dict(args.keyword_dict)
-                category_map = load_category_map(args.category_map)
-                image_tags = load_image_tags(args.image_tags)
-                if args.auto_tag:
-                    auto_tags = auto_generate_image_tags(images, args.auto_tag_min_len)
-                    image_tags = merge_image_tags(image_tags, auto_tags)
-                    with open(args.auto_tag_out, "w", encoding="utf-8") as f:
-                        json.dump(image_tags, f, ensure_ascii=False, indent=2)
-                write_image_concat_file(
-                    lines,
-                    durations,
-                    images,
+                emit("images", "matching background images")
+                with timed_stage("image matching"):
+                    images, keyword_dict, category_map, image_tags, index = prepare_image_matching(
+                        args, shared
+                    )
+                    image_concat = os.path.join(tmpdir, "images.txt")
+                    write_image_concat_file(
+                        lines,
+                        durations,
+                        images,
+                        image_concat,
+                        args.seed,
+                        keyword_dict,
+                        category_map,
+                        args.category_boost,
+                        image_tags,
+                        args.tag_boost,
+                        index,
+                    )
+            emit("render", "encoding video")
+            with timed_stage("render"):
+                run_script_video(
+                    args.output,
+                    width,
+                    height,
+                    total_duration,
+                    subtitle_path,
+                    args.subtitle_style,
+                    args.bg_color,
+                    args.bg_image,
                     image_concat,
-                    args.seed,
-                    keyword_dict,
-                    category_map,
-                    args.category_boost,
-                    image_tags,
-                    args.tag_boost,
+                    audio_path,
+                    bgm_path,
+                    args.bgm_volume,
+                    args.voice_volume,
                 )
-            run_script_video(
-                args.output,
-                width,
-                height,
-                total_duration,
-                subtitle_path,
-                args.subtitle_style,
-                args.bg_color,
-                args.bg_image,
-                image_concat,
-                audio_path,
-                bgm_path,
-                args.bgm_volume,
-                args.voice_volume,
-            )
-        return 0
+        emit("done", args.output, 1.0)
+        return RenderResult(args.output, total_duration, lines=lines)
 
-    all_segments: List[Segment] = []
-    for source in args.input:
-        if not os.path.exists(source):
-            raise FileNotFoundError(source)
-        duration = ffprobe_duration(source)
-        scene_times = detect_scene_changes(source, args.scene_threshold)
-        segments = build_segments(
-            source,
-            duration,
-            scene_times,
-            args.min_len,
-            args.max_len,
-            args.skip_start,
-            args.skip_end,
-        )
-        scored = score_segments(segments, scene_times, args.style)
-        all_segments.extend(scored)
+    emit("analyze", f"{len(args.input)} sources", 0.0)
+    with timed_stage("analyze"):
+        all_segments = analyze_sources(args.input, args, shared, on_event)
 
-    selected = select_segments(
-        all_segments, args.target_min, args.target_max, args.style, args.seed
-    )
+    with timed_stage("select"):
+        selected = select_segments(
+            all_segments, args.target_min, args.target_max, args.style, args.seed, args.selector
+        )
     if not selected:
         raise RuntimeError("No segments selected. Try adjusting thresholds.")
+    selected_duration = sum(seg.duration for seg in selected)
+    emit("select", f"{len(selected)} segments, {selected_duration:.1f}s")
 
     if args.dry_run:
         for seg in selected:
             print(f"{seg.source}: {seg.start:.2f}-{seg.end:.2f} ({seg.duration:.2f}s)")
-        return 0
+        return RenderResult(args.output, selected_duration, selected, dry_run=True)
 
+    lines: List[str] = []
     with tempfile.TemporaryDirectory() as tmpdir:
         concat_path = os.path.join(tmpdir, "concat.txt")
         write_concat_file(selected, concat_path)
         subtitle_path = None
+        cues: List[Tuple[float, float, str]] = []
         if args.script:
             script_text = read_text_file(args.script)
             lines = split_script(script_text, args.subtitle_max_len)
-            total_duration = sum(seg.duration for seg in selected)
-            durations, _ = compute_line_durations(lines, args.cps, total_duration=total_duration)
+            durations, _ = compute_line_durations(lines, args.cps, total_duration=selected_duration)
+            cues = subtitle_cues(lines, durations)
             srt_path = os.path.join(tmpdir, "subtitles.srt")
-            write_srt_with_durations(lines, durations, srt_path)
+            write_srt_cues(cues, srt_path)
             subtitle_path = normalize_subtitle_path(srt_path)
-        run_concat(concat_path, args.output, width, height, subtitle_path, args.subtitle_style)
-    return 0
+        render_cache = open_render_cache(args, shared)
+        emit("render", f"encoding ({args.render_mode})")
+        with timed_stage(f"render {args.render_mode}"):
+            if args.render_mode == "chunked" or render_cache:
+                jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+                run_chunked_concat(
+                    selected,
+                    args.output,
+                    width,
+                    height,
+                    cues,
+                    args.subtitle_style,
+                    args.chunk_seconds,
+                    jobs,
+                    tmpdir,
+                    render_cache,
+                )
+            else:
+                profile = None
+                if args.render_mode == "smart" and not subtitle_path:
+                    profile = smart_render_profile([seg.source for seg in selected], width, height)
+                    if profile is None:
+                        print("Sources need re-encoding; smart render disabled.", file=sys.stderr)
+                if profile is not None:
+                    run_smart_concat(selected, args.output, profile, tmpdir)
+                else:
+                    run_concat(concat_path, args.output, width, height, subtitle_path, args.subtitle_style)
+    emit("done", args.output, 1.0)
+    return RenderResult(args.output, selected_duration, selected, lines)
+
+
+def load_batch_jobs(path: str, base: argparse.Namespace) -> List[argparse.Namespace]:
+    """Read one job per JSONL line; keys are CLI option names overriding ``base``.
+
+    Values go through the CLI parser, so they get the same types and
+    choices as on the command line.
+    """
+    parser = build_parser()
+    actions = {action.dest: action for action in parser._actions if action.option_strings}
+    jobs = []
+    outputs: Dict[str, int] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise RuntimeError(f"batch line {line_no} must be a JSON object.")
+
+            def fail(message: str, line_no: int = line_no) -> None:
+                raise RuntimeError(f"batch line {line_no}: {message}")
+
+            parser.error = fail
+            defaults = dict(vars(base), batch=None)
+            argv: List[str] = []
+            for key, value in data.items():
+                name = key.lstrip("-").replace("-", "_")
+                action = actions.get(name)
+                if action is None or name in ("batch", "help"):
+                    fail(f"unknown option '{key}'.")
+                option = action.option_strings[-1]
+                if action.nargs == 0:
+                    if not isinstance(value, bool):
+                        fail(f"{option} takes true or false.")
+                    defaults[name] = value
+                elif value is None:
+                    defaults[name] = None
+                elif isinstance(value, list):
+                    argv += [option, *(str(item) for item in value)]
+                else:
+                    argv.append(f"{option}={value}")
+            parser.set_defaults(**defaults)
+            job = parser.parse_args(argv)
+            # Jobs run concurrently and ffmpeg overwrites with -y, so each
+            # one needs its own explicit output.
+            if not any(key.lstrip("-").replace("-", "_") == "output" for key in data):
+                fail("missing 'output'.")
+            target = os.path.abspath(job.output)
+            if target in outputs:
+                fail(f"output '{job.output}' is already used by line {outputs[target]}.")
+            outputs[target] = line_no
+            jobs.append(job)
+    return jobs
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    jobs = load_batch_jobs(args.batch, args)
+    shared = SharedState()
+    workers = args.batch_workers if args.batch_workers > 0 else (os.cpu_count() or 1)
+
+    def run(job: argparse.Namespace) -> Optional[str]:
+        try:
+            run_job(job, shared)
+        except Exception as exc:
+            return str(exc)
+        return None
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+        for job, error in zip(jobs, pool.map(run, jobs)):
+            if error:
+                failed += 1
+                print(f"FAILED {job.output}: {error}", file=sys.stderr)
+            else:
+                print(f"OK {job.output}")
+    print(f"{len(jobs) - failed}/{len(jobs)} jobs succeeded", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def config_to_args(config: Any) -> argparse.Namespace:
+    return argparse.Namespace(**asdict(config))
+
+
+def render_edit(
+    config: Any,
+    on_event: Optional[EventCallback] = None,
+    shared: Optional[SharedState] = None,
+) -> RenderResult:
+    """Cut ``config.input`` videos into an edit; library form of the CLI."""
+    if not config.input:
+        raise RuntimeError("render_edit requires input videos.")
+    return run_job(config_to_args(config), shared, on_event)
+
+
+def render_script_video(
+    config: Any,
+    on_event: Optional[EventCallback] = None,
+    shared: Optional[SharedState] = None,
+) -> RenderResult:
+    """Render a script-only video (subtitles, backgrounds, BGM, optional TTS)."""
+    if config.input:
+        raise RuntimeError("render_script_video does not take input videos; use render_edit.")
+    return run_job(config_to_args(config), shared, on_event)
+
+
+def main() -> int:
+    global PROFILER
+    args = parse_args()
+    if args.profile or args.timings_json or args.cprofile_dir:
+        PROFILER = Profiler(args.cprofile_dir)
+    try:
+        if args.batch:
+            return run_batch(args)
+        run_job(args)
+        return 0
+    finally:
+        if PROFILER:
+            if args.profile:
+                PROFILER.print_summary()
+            if args.timings_json:
+                with open(args.timings_json, "w", encoding="utf-8") as f:
+                    json.dump(PROFILER.report(), f, indent=2)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+"""Compare full-resolution scene detection with --analysis-mode fast.
+
+Reports wall time per mode, the speed-up, and how far the fast cut points
+drift from the full-decode ones. Without --input a synthetic 4K clip with a
+hard cut every few seconds is generated first.
+
+    python auto-editor/benchmarks/bench_analysis_mode.py
+    python auto-editor/benchmarks/bench_analysis_mode.py --input clip.mp4
+"""
+
+import argparse
+import bisect
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+from synthetic import auto_editor, ffmpeg_available, make_clip
+
+
+def cut_drift(reference: List[float], candidate: List[float], tolerance: float) -> dict:
+    drifts = []
+    missed = 0
+    for t in reference:
+        i = bisect.bisect_left(candidate, t)
+        near = [candidate[j] for j in (i - 1, i) if 0 <= j < len(candidate)]
+        if not near:
+            missed += 1
+            continue
+        d = min(abs(t - c) for c in near)
+        if d > tolerance:
+            missed += 1
+        else:
+            drifts.append(d)
+    return {
+        "reference_cuts": len(reference),
+        "candidate_cuts": len(candidate),
+        "matched": len(drifts),
+        "missed": missed,
+        "mean_drift": sum(drifts) / len(drifts) if drifts else 0.0,
+        "max_drift": max(drifts) if drifts else 0.0,
+    }
+
+
+def time_detect(path: str, threshold: float, options: auto_editor.AnalysisOptions, repeat: int):
+    best = None
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        times = auto_editor.detect_scene_changes(path, threshold, options)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark full vs fast scene analysis.")
+    parser.add_argument("--input", nargs="*", help="Video files (default: synthetic 4K clip)")
+    parser.add_argument("--scene-threshold", type=float, default=0.3)
+    parser.add_argument("--analysis-width", type=int, default=320)
+    parser.add_argument("--analysis-fps", type=float, default=0.0)
+    parser.add_argument("--keyframes-only", action="store_true")
+    parser.add_argument("--analysis-threads", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Max drift (s) counted as a match")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    if not ffmpeg_available():
+        print("ffmpeg not found on PATH", file=sys.stderr)
+        return 1
+
+    inputs = args.input
+    if not inputs:
+        clip = os.path.join(tempfile.gettempdir(), "auto-editor-bench-4k.mp4")
+        inputs = [make_clip(clip, width=3840, height=2160, shots=10, shot_len=3.0)]
+
+    full = auto_editor.AnalysisOptions(mode="full", threads=args.analysis_threads)
+    fast = auto_editor.AnalysisOptions(
+        mode="fast",
+        width=args.analysis_width,
+        fps=args.analysis_fps,
+        keyframes_only=args.keyframes_only,
+        threads=args.analysis_threads,
+    )
+    results = []
+    for path in inputs:
+        full_sec, full_cuts = time_detect(path, args.scene_threshold, full, args.repeat)
+        fast_sec, fast_cuts = time_detect(path, args.scene_threshold, fast, args.repeat)
+        results.append(
+            {
+                "input": path,
+                "fast_variant": fast.variant(),
+                "full_sec": round(full_sec, 3),
+                "fast_sec": round(fast_sec, 3),
+                "speedup": round(full_sec / fast_sec, 2) if fast_sec > 0 else None,
+                "drift": cut_drift(full_cuts, fast_cuts, args.tolerance),
+            }
+        )
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
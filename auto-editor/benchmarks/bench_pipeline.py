@@ -0,0 +1,208 @@
+"""Time each auto_editor pipeline stage on synthetic media of several sizes.
+
+For every size a lavfi clip (hard cut per shot, sine audio) and an image
+library are generated once under --workdir, then the script times
+ffprobe_duration, detect_scene_changes, build/score/select_segments, image
+indexing and pick_image_for_line, and the full edit and script-only
+renders. Results are printed (or written with --output) as JSON together
+with the machine, Python, ffmpeg and git revision, so runs can be compared.
+
+    python auto-editor/benchmarks/bench_pipeline.py --sizes small medium
+    python auto-editor/benchmarks/bench_pipeline.py --skip-render --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+from synthetic import auto_editor, ffmpeg_available, make_clip, make_image_library, make_script_lines
+
+SIZES = {
+    "small": {"width": 640, "height": 360, "shots": 10, "shot_len": 3.0, "images": 200, "lines": 40},
+    "medium": {"width": 1280, "height": 720, "shots": 30, "shot_len": 3.0, "images": 2000, "lines": 200},
+    "large": {"width": 1920, "height": 1080, "shots": 60, "shot_len": 4.0, "images": 10000, "lines": 1000},
+}
+
+# Lines rendered in the script-only video, so its length stays comparable
+# across sizes while matching still runs against the whole library.
+RENDER_LINES = 20
+
+
+def best_of(repeat: int, fn: Callable[[], object]) -> Tuple[float, object]:
+    best = None
+    result = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 4), result
+
+
+def environment() -> dict:
+    _, out, _ = auto_editor.run_cmd(["ffmpeg", "-version"])
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "ffmpeg": out.splitlines()[0] if out else "",
+        "commit": commit or None,
+    }
+
+
+def bench_size(name: str, spec: dict, args: argparse.Namespace) -> dict:
+    root = os.path.join(args.workdir, name)
+    os.makedirs(root, exist_ok=True)
+    timings = {}
+
+    start = time.perf_counter()
+    clip = make_clip(
+        os.path.join(root, "clip.mp4"), spec["width"], spec["height"], spec["shots"], spec["shot_len"]
+    )
+    images = make_image_library(os.path.join(root, "images"), spec["images"], spec["width"], spec["height"])
+    timings["generate_media"] = round(time.perf_counter() - start, 3)
+
+    timings["ffprobe_duration"], duration = best_of(args.repeat, lambda: auto_editor.ffprobe_duration(clip))
+    options = auto_editor.AnalysisOptions(mode=args.analysis_mode)
+    timings["detect_scene_changes"], cuts = best_of(
+        args.repeat, lambda: auto_editor.detect_scene_changes(clip, args.scene_threshold, options)
+    )
+
+    # The pure-Python stages run in microseconds on one clip, so they are
+    # timed on the cut list repeated as if it came from many sources.
+    sources = [f"{clip}#{i}" for i in range(args.sources)]
+
+    def build() -> List[auto_editor.Segment]:
+        segments = []
+        for source in sources:
+            segments += auto_editor.build_segments(source, duration, cuts, 2.0, 6.0, 0.0, 0.0)
+        return segments
+
+    def score() -> List[auto_editor.Segment]:
+        return auto_editor.score_segments(segments, cuts, args.style)
+
+    timings["build_segments"], segments = best_of(args.repeat, build)
+    timings["score_segments"], scored = best_of(args.repeat, score)
+    target_min = len(sources) * duration * 0.3
+    target_max = len(sources) * duration * 0.6
+    timings["select_segments"], selected = best_of(
+        args.repeat,
+        lambda: auto_editor.select_segments(scored, target_min, target_max, args.style, 42, args.selector),
+    )
+
+    lines = make_script_lines(spec["lines"])
+    timings["collect_images"], images = best_of(
+        args.repeat, lambda: auto_editor.collect_images(os.path.join(root, "images"))
+    )
+    tags = auto_editor.auto_generate_image_tags(images, 2)
+    timings["image_index_build"], index = best_of(
+        args.repeat, lambda: auto_editor.ImageIndex.build(images, tags)
+    )
+
+    def pick_all() -> List[str]:
+        return [
+            auto_editor.pick_image_for_line(images, line, 42 + i, {}, {}, 2.0, tags, 2.0, index)
+            for i, line in enumerate(lines)
+        ]
+
+    timings["pick_image_for_line"], picks = best_of(args.repeat, pick_all)
+
+    result = {
+        "size": name,
+        "spec": spec,
+        "clip_duration": round(duration, 2),
+        "cuts": len(cuts),
+        "segments": len(segments),
+        "selected": len(selected),
+        "images": len(images),
+        "distinct_picks": len(set(picks)),
+        "pick_ms_per_line": round(timings["pick_image_for_line"] * 1000 / max(1, len(lines)), 4),
+        "timings_sec": timings,
+    }
+    if args.skip_render:
+        return result
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        resolution = f"{spec['width']}x{spec['height']}"
+        edit = auto_editor.parse_args(
+            [
+                "--input", clip,
+                "--output", os.path.join(tmpdir, "edit.mp4"),
+                "--resolution", resolution,
+                "--style", args.style,
+                "--target-min", str(duration * 0.3),
+                "--target-max", str(duration * 0.6),
+                "--skip-start", "0",
+                "--skip-end", "0",
+                "--no-cache",
+            ]
+        )
+        start = time.perf_counter()
+        auto_editor.run_job(edit)
+        timings["render_edit"] = round(time.perf_counter() - start, 3)
+
+        script_path = os.path.join(tmpdir, "script.txt")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines[:RENDER_LINES]))
+        script = auto_editor.parse_args(
+            [
+                "--script", script_path,
+                "--bg-dir", os.path.join(root, "images"),
+                "--output", os.path.join(tmpdir, "script.mp4"),
+                "--resolution", resolution,
+                "--no-cache",
+            ]
+        )
+        start = time.perf_counter()
+        auto_editor.run_job(script)
+        timings["render_script"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the auto_editor pipeline on synthetic media.")
+    parser.add_argument("--sizes", nargs="*", choices=sorted(SIZES), default=["small", "medium"])
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "auto-editor-bench"))
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of count for each timing")
+    parser.add_argument("--sources", type=int, default=50, help="Copies of the cut list for segment stages")
+    parser.add_argument("--scene-threshold", type=float, default=0.3)
+    parser.add_argument("--analysis-mode", choices=["full", "fast"], default="full")
+    parser.add_argument("--style", choices=["fast", "narration", "tutorial", "montage"], default="fast")
+    parser.add_argument("--selector", choices=["optimal", "greedy"], default="optimal")
+    parser.add_argument("--skip-render", action="store_true")
+    parser.add_argument("--output", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    if not ffmpeg_available():
+        print("ffmpeg not found on PATH", file=sys.stderr)
+        return 1
+
+    report = {"environment": environment(), "results": []}
+    for name in args.sizes:
+        report["results"].append(bench_size(name, SIZES[name], args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Micro-benchmark: bisect-based score_segments vs the original linear scan.
+
+Builds synthetic scene timestamps (no ffmpeg needed) and times both scorers
+at growing input lengths, checking that they produce identical scores.
+
+    python auto-editor/benchmarks/bench_score_segments.py
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import List
+
+from synthetic import auto_editor
+
+Segment = auto_editor.Segment
+
+
+def score_segments_linear(segments: List[Segment], scene_times: List[float], style: str) -> List[Segment]:
+    # Reference copy of the O(segments x scenes) implementation.
+    for seg in segments:
+        scenes_in_seg = sum(1 for t in scene_times if seg.start <= t <= seg.end)
+        scene_rate = scenes_in_seg / max(seg.duration, 0.1)
+        if style == "fast":
+            seg.score = scene_rate + (1.0 / max(seg.duration, 1.0))
+        elif style == "montage":
+            seg.score = scene_rate + (0.5 / max(seg.duration, 1.0))
+        elif style == "narration":
+            seg.score = max(0.0, 1.0 - abs(seg.duration - 8.0) / 8.0) + scene_rate
+        elif style == "tutorial":
+            seg.score = max(0.0, 1.0 - abs(seg.duration - 12.0) / 12.0)
+        else:
+            seg.score = scene_rate
+    return segments
+
+
+def synthetic_scenes(hours: float, cuts_per_minute: float, seed: int) -> List[float]:
+    rng = random.Random(seed)
+    duration = hours * 3600.0
+    count = int(hours * 60 * cuts_per_minute)
+    return sorted(rng.uniform(0.0, duration) for _ in range(count))
+
+
+def time_scorer(scorer, segments: List[Segment], scene_times: List[float], style: str):
+    copies = [Segment(s.source, s.start, s.end, 0.0) for s in segments]
+    start = time.perf_counter()
+    scorer(copies, scene_times, style)
+    return time.perf_counter() - start, [s.score for s in copies]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark score_segments scaling.")
+    parser.add_argument("--hours", type=float, nargs="*", default=[0.25, 1.0, 2.0, 4.0])
+    parser.add_argument("--cuts-per-minute", type=float, default=12.0)
+    parser.add_argument("--style", default="fast")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = []
+    for hours in args.hours:
+        scene_times = synthetic_scenes(hours, args.cuts_per_minute, args.seed)
+        segments = auto_editor.build_segments("bench", hours * 3600.0, scene_times, 2.0, 6.0, 2.0, 2.0)
+        linear_sec, linear_scores = time_scorer(score_segments_linear, segments, scene_times, args.style)
+        bisect_sec, bisect_scores = time_scorer(auto_editor.score_segments, segments, scene_times, args.style)
+        results.append(
+            {
+                "hours": hours,
+                "scenes": len(scene_times),
+                "segments": len(segments),
+                "linear_sec": round(linear_sec, 4),
+                "bisect_sec": round(bisect_sec, 4),
+                "speedup": round(linear_sec / bisect_sec, 1) if bisect_sec > 0 else None,
+                "identical": linear_scores == bisect_scores,
+            }
+        )
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Compare the optimal (knapsack) and greedy fast/montage segment pickers.
+
+Candidate segments are synthetic (no ffmpeg needed). For each size and
+target range the script reports total score, picked duration, distance
+from the target and runtime for both selectors, and exits non-zero if
+optimal scores below greedy, runs past the range's maximum or takes
+longer than --budget-sec.
+
+    python auto-editor/benchmarks/bench_select_segments.py
+    python auto-editor/benchmarks/bench_select_segments.py --targets 60:300 600:3000 --counts 10000
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from typing import List, Tuple
+
+from synthetic import auto_editor
+
+Segment = auto_editor.Segment
+
+
+def synthetic_segments(count: int, min_len: float, max_len: float, style: str, seed: int) -> List[Segment]:
+    rng = random.Random(seed)
+    segments = []
+    scene_times = []
+    t = 0.0
+    for i in range(count):
+        duration = rng.uniform(min_len, max_len)
+        segments.append(Segment(f"clip{i % 40:02d}.mp4", t, t + duration, 0.0))
+        scene_times += [rng.uniform(t, t + duration) for _ in range(rng.randint(0, 3))]
+        t += duration
+    return auto_editor.score_segments(segments, scene_times, style)
+
+
+def parse_target(text: str) -> Tuple[float, float]:
+    low, _, high = text.partition(":")
+    return float(low), float(high)
+
+
+def run_selector(
+    segments: List[Segment], target_min: float, target_max: float, args: argparse.Namespace, selector: str
+) -> dict:
+    start = time.perf_counter()
+    picked = auto_editor.select_segments(segments, target_min, target_max, args.style, args.seed, selector)
+    elapsed = time.perf_counter() - start
+    total = sum(seg.duration for seg in picked)
+    target = auto_editor.pick_target_duration(target_min, target_max)
+    return {
+        "sec": round(elapsed, 4),
+        "picked": len(picked),
+        "total_score": round(sum(seg.score for seg in picked), 3),
+        "duration": round(total, 2),
+        "off_target": round(total - target, 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark segment selection quality and runtime.")
+    parser.add_argument("--counts", type=int, nargs="*", default=[100, 1000, 10000, 20000])
+    parser.add_argument("--style", choices=["fast", "montage"], default="fast")
+    parser.add_argument(
+        "--targets",
+        type=parse_target,
+        nargs="*",
+        default=[(60.0, 300.0), (600.0, 3000.0)],
+        help="MIN:MAX target ranges in seconds (default 60:300 600:3000)",
+    )
+    parser.add_argument("--budget-sec", type=float, default=1.0, help="Slowest acceptable optimal run")
+    parser.add_argument("--min-len", type=float, default=2.0)
+    parser.add_argument("--max-len", type=float, default=6.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    for count in args.counts:
+        segments = synthetic_segments(count, args.min_len, args.max_len, args.style, args.seed)
+        for target_min, target_max in args.targets:
+            greedy = run_selector(segments, target_min, target_max, args, "greedy")
+            optimal = run_selector(segments, target_min, target_max, args, "optimal")
+            ok = (
+                optimal["total_score"] >= greedy["total_score"]
+                and optimal["duration"] <= target_max
+                and optimal["sec"] <= args.budget_sec
+            )
+            failed = failed or not ok
+            results.append(
+                {
+                    "candidates": count,
+                    "target": [target_min, target_max],
+                    "greedy": greedy,
+                    "optimal": optimal,
+                    "ok": ok,
+                }
+            )
+    print(json.dumps(results, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Synthetic media for the auto_editor benchmarks, built from ffmpeg lavfi sources."""
+
+import os
+import random
+import shutil
+import subprocess
+import sys
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auto_editor  # noqa: E402
+
+# Cycling through visibly different sources gives a hard cut at every shot.
+SHOT_SOURCES = ["testsrc2", "smptehdbars", "rgbtestsrc", "testsrc", "yuvtestsrc"]
+
+
+def make_clip(
+    path: str,
+    width: int = 1920,
+    height: int = 1080,
+    shots: int = 10,
+    shot_len: float = 3.0,
+    fps: int = 30,
+) -> str:
+    """Write an H.264 clip with ``shots`` hard cuts and a sine audio track."""
+    if os.path.exists(path):
+        return path
+    parts = []
+    labels = []
+    for i in range(shots):
+        src = SHOT_SOURCES[i % len(SHOT_SOURCES)]
+        parts.append(f"{src}=size={width}x{height}:rate={fps}:duration={shot_len}[v{i}]")
+        labels.append(f"[v{i}]")
+    graph = ";".join(parts) + ";" + "".join(labels) + f"concat=n={shots}:v=1:a=0[v]"
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-y",
+        "-filter_complex",
+        graph,
+        "-f",
+        "lavfi",
+        "-i",
+        f"sine=frequency=440:duration={shots * shot_len}",
+        "-map",
+        "[v]",
+        "-map",
+        "0:a",  # the sine source is the only -i input
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-pix_fmt",
+        "yuv420p",
+        "-c:a",
+        "aac",
+        "-shortest",
+        path,
+    ]
+    code, _, err = auto_editor.run_cmd(cmd)
+    if code != 0:
+        raise RuntimeError(f"ffmpeg synthetic clip failed: {err.strip()[-500:]}")
+    return path
+
+
+# Folder and file-name words for image libraries; script lines drawn from the
+# same vocabulary hit the path-token index the way real libraries do.
+CATEGORIES = ["city", "nature", "food", "office", "travel", "sport", "tech", "family"]
+SUBJECTS = [
+    "sunset", "street", "coffee", "laptop", "beach", "forest",
+    "team", "market", "mountain", "river", "kitchen", "stadium",
+]
+
+
+def make_image_library(
+    root: str, count: int = 200, width: int = 640, height: int = 360, seed: int = 42
+) -> List[str]:
+    """Write ``count`` distinct JPEGs as ``root/<category>/<subject>_<n>.jpg``."""
+    marker = os.path.join(root, f".complete-{count}-{width}x{height}-{seed}")
+    if os.path.exists(marker):
+        return sorted(auto_editor.collect_images(root))
+    # A library left by another spec (or an interrupted run) would mix its
+    # images into this one, so everything this function writes is removed.
+    if os.path.isdir(root):
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name in CATEGORIES or name == ".staging":
+                shutil.rmtree(path)
+            elif name.startswith(".complete-"):
+                os.remove(path)
+    staging = os.path.join(root, ".staging")
+    os.makedirs(staging, exist_ok=True)
+    # One ffmpeg run writes every image; consecutive testsrc2 frames differ.
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-y",
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc2=size={width}x{height}:rate=25",
+        "-frames:v",
+        str(count),
+        "-q:v",
+        "5",
+        os.path.join(staging, "img%06d.jpg"),
+    ]
+    code, _, err = auto_editor.run_cmd(cmd)
+    if code != 0:
+        raise RuntimeError(f"ffmpeg synthetic images failed: {err.strip()[-500:]}")
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        folder = os.path.join(root, CATEGORIES[i % len(CATEGORIES)])
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{rng.choice(SUBJECTS)}_{i:06d}.jpg")
+        os.replace(os.path.join(staging, f"img{i + 1:06d}.jpg"), path)
+        paths.append(path)
+    os.rmdir(staging)
+    open(marker, "w").close()
+    return sorted(paths)
+
+
+def make_script_lines(count: int = 40, seed: int = 42) -> List[str]:
+    """Script lines mixing library words with words no image matches."""
+    rng = random.Random(seed)
+    filler = ["today", "we", "look", "at", "the", "new", "plan", "again"]
+    lines = []
+    for _ in range(count):
+        words = rng.sample(filler, 3) + [rng.choice(CATEGORIES), rng.choice(SUBJECTS)]
+        rng.shuffle(words)
+        lines.append(" ".join(words))
+    return lines
+
+
+def ffmpeg_available() -> bool:
+    try:
+        subprocess.run(["ffmpeg", "-version"], capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return False
+    return True
@@ -0,0 +1,36 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auto_editor  # noqa: E402
+
+
+def fake_scene_times(monkeypatch, sources):
+    # Earlier sources take longest, so a pool finishes them in reverse order.
+    delays = {source: 0.02 * (len(sources) - i) for i, source in enumerate(sources)}
+
+    def load_scene_times(source, args, cache=None, shared=None, on_event=None):
+        time.sleep(delays[source])
+        index = sources.index(source)
+        return 20.0 + index, [3.0 + index, 9.5, 14.0 + index * 0.5]
+
+    monkeypatch.setattr(auto_editor, "load_scene_times", load_scene_times)
+
+
+def test_parallel_analysis_keeps_input_order(tmp_path, monkeypatch):
+    sources = []
+    for i in range(6):
+        path = tmp_path / f"clip{i}.mp4"
+        path.write_bytes(b"")
+        sources.append(str(path))
+    fake_scene_times(monkeypatch, sources)
+
+    def analyze(jobs):
+        args = auto_editor.parse_args(["--input", *sources, "--no-cache", "--jobs", str(jobs)])
+        return auto_editor.analyze_sources(sources, args)
+
+    serial = analyze(1)
+    assert serial == analyze(4)
+    assert [seg.source for seg in serial] == sorted([seg.source for seg in serial], key=sources.index)
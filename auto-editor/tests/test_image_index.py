@@ -0,0 +1,58 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auto_editor  # noqa: E402
+
+
+def baseline_pick(images, line, seed, keyword_dict, category_map, category_boost, image_tags, tag_boost):
+    """pick_image_for_line before ImageIndex: score every image by scanning."""
+    keywords = auto_editor.extract_keywords(line)
+    expanded = auto_editor.expand_keywords(keywords, keyword_dict)
+    categories = auto_editor.match_categories(keywords, category_map, expanded)
+    if not expanded:
+        return random.Random(seed).choice(images)
+    scored = []
+    for img in images:
+        tokens = auto_editor.tokenize_path(img)
+        score = 0.0
+        for kw, weight, _ in expanded:
+            if kw in tokens:
+                score += weight
+        for cat in categories:
+            if cat in tokens:
+                score += category_boost
+        tags = image_tags.get(os.path.basename(img).lower(), [])
+        if tags:
+            for kw, weight, _ in expanded:
+                if kw in tags:
+                    score += max(weight, tag_boost)
+            for cat in categories:
+                if cat in tags:
+                    score += category_boost
+        scored.append((score, img))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    if scored[0][0] == 0:
+        return random.Random(seed).choice(images)
+    return scored[0][1]
+
+
+def test_image_index_picks_match_baseline():
+    rng = random.Random(11)
+    words = ["city", "sunset", "coffee", "beach", "team", "forest", "river", "market"]
+    images = [
+        os.path.join("lib", rng.choice(words), f"{rng.choice(words)}_{rng.choice(words)}_{i}.jpg")
+        for i in range(400)
+    ]
+    image_tags = {
+        os.path.basename(img).lower(): rng.sample(words, 2) for img in rng.sample(images, 80)
+    }
+    keyword_dict = {"sunset": ["beach", "evening"], "coffee": ["market"]}
+    category_map = {"outdoor": ["forest", "river"], "work": ["team", "coffee"]}
+    index = auto_editor.ImageIndex.build(images, image_tags)
+    for i in range(200):
+        line = " ".join(rng.sample(words + ["today", "plan", "again"], 3))
+        args = (images, line, 42 + i, keyword_dict, category_map, 2.0, image_tags, 2.0)
+        assert auto_editor.pick_image_for_line(*args, index) == baseline_pick(*args)
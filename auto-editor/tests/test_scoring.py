@@ -0,0 +1,56 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auto_editor  # noqa: E402
+from auto_editor import Segment  # noqa: E402
+
+STYLES = ["fast", "montage", "narration", "tutorial"]
+
+
+def random_segments(count, seed, min_len=2.0, max_len=6.0):
+    rng = random.Random(seed)
+    segments = []
+    scene_times = []
+    t = 0.0
+    for i in range(count):
+        duration = rng.uniform(min_len, max_len)
+        segments.append(Segment(f"clip{i % 7}.mp4", t, t + duration, 0.0))
+        scene_times += [rng.uniform(t, t + duration) for _ in range(rng.randint(0, 3))]
+        # Cuts exactly on a boundary count for both neighbours.
+        if rng.random() < 0.2:
+            scene_times.append(t)
+        t += duration
+    return segments, scene_times
+
+
+def linear_scores(segments, scene_times, style):
+    """The original per-segment scan that score_segments replaced."""
+    scores = []
+    for seg in segments:
+        scenes_in_seg = sum(1 for t in scene_times if seg.start <= t <= seg.end)
+        scene_rate = scenes_in_seg / max(seg.duration, 0.1)
+        if style == "fast":
+            scores.append(scene_rate + (1.0 / max(seg.duration, 1.0)))
+        elif style == "montage":
+            scores.append(scene_rate + (0.5 / max(seg.duration, 1.0)))
+        elif style == "narration":
+            scores.append(max(0.0, 1.0 - abs(seg.duration - 8.0) / 8.0) + scene_rate)
+        elif style == "tutorial":
+            scores.append(max(0.0, 1.0 - abs(seg.duration - 12.0) / 12.0))
+        else:
+            scores.append(scene_rate)
+    return scores
+
+
+@pytest.mark.parametrize("style", STYLES)
+def test_score_segments_matches_linear_scan(style):
+    segments, scene_times = random_segments(300, seed=7)
+    random.Random(1).shuffle(scene_times)
+    expected = linear_scores(segments, scene_times, style)
+    scored = auto_editor.score_segments(segments, scene_times, style)
+    assert [seg.score for seg in scored] == pytest.approx(expected)
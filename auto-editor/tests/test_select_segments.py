@@ -0,0 +1,57 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auto_editor  # noqa: E402
+from auto_editor import Segment  # noqa: E402
+
+
+def scored_segments(count, seed, min_len=2.0, max_len=6.0):
+    rng = random.Random(seed)
+    segments = []
+    t = 0.0
+    for i in range(count):
+        duration = rng.uniform(min_len, max_len)
+        score = rng.randint(0, 3) / duration + 1.0 / duration
+        segments.append(Segment(f"clip{i % 7}.mp4", t, t + duration, score))
+        t += duration
+    return segments
+
+
+@pytest.mark.parametrize("count", [10, 100, 1000, 10000, 20000])
+@pytest.mark.parametrize("capacity", [20.0, 180.0])
+def test_knapsack_select_fits_and_beats_greedy(count, capacity):
+    segments = scored_segments(count, seed=count)
+    picked = auto_editor.knapsack_select(segments, capacity)
+    greedy = auto_editor.greedy_pick(segments, capacity)
+    assert sum(seg.duration for seg in picked) <= capacity
+    assert auto_editor.total_score(picked) >= auto_editor.total_score(greedy)
+    assert len({id(seg) for seg in picked}) == len(picked)
+
+
+def test_knapsack_select_is_optimal_on_small_inputs():
+    rng = random.Random(3)
+    for _ in range(20):
+        segments = [Segment("a.mp4", 0.0, rng.choice([1.0, 2.0, 3.0, 5.0]), rng.uniform(0, 5)) for _ in range(8)]
+        capacity = 7.0
+        best = 0.0
+        for mask in range(1 << len(segments)):
+            subset = [seg for i, seg in enumerate(segments) if mask >> i & 1]
+            if sum(seg.duration for seg in subset) <= capacity:
+                best = max(best, auto_editor.total_score(subset))
+        picked = auto_editor.knapsack_select(segments, capacity)
+        assert auto_editor.total_score(picked) == pytest.approx(best)
+
+
+@pytest.mark.parametrize("count", [100, 1000, 10000, 20000])
+@pytest.mark.parametrize("target_min, target_max", [(60, 300), (600, 3000)])
+def test_select_segments_optimal_never_below_greedy(count, target_min, target_max):
+    segments = scored_segments(count, seed=count + 1)
+    greedy = auto_editor.select_segments(segments, target_min, target_max, "fast", 42, "greedy")
+    optimal = auto_editor.select_segments(segments, target_min, target_max, "fast", 42, "optimal")
+    assert sum(seg.duration for seg in optimal) <= target_max
+    assert auto_editor.total_score(optimal) >= auto_editor.total_score(greedy)
@@ -3,27 +3,212 @@ MAGE Payment Backend
 Flask server that creates Square checkout links for the MAGE website.
 """
 
+import hashlib
+import json
 import os
+import threading
+import time
 import uuid
-from flask import Flask, request, jsonify
+from collections import OrderedDict
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from square.client import Client
+
+import metrics
+from square_transport import (
+    BASE_URLS,
+    DEFAULT_API_VERSION,
+    CircuitBreaker,
+    SquareCircuitOpen,
+    SquareTransport,
+    SquareUnavailable,
+)
 
 app = Flask(__name__)
-CORS(app)  # Allow cross-origin requests from GitHub Pages
+CORS(app, expose_headers=["Retry-After"])  # Allow cross-origin requests from GitHub Pages
 
 # Square credentials from environment variables
 SQUARE_ACCESS_TOKEN = os.environ.get("SQUARE_ACCESS_TOKEN", "")
 SQUARE_LOCATION_ID = os.environ.get("SQUARE_LOCATION_ID", "")
 SQUARE_ENVIRONMENT = os.environ.get("SQUARE_ENVIRONMENT", "sandbox")  # "sandbox" or "production"
 
-# Initialize Square client
-square_client = Client(
+# Backpressure: at most this many checkouts wait on Square at once per process.
+# Past that, requests queue for CHECKOUT_QUEUE_TIMEOUT seconds and then get a
+# 503 with Retry-After, so a drop cannot tie up every worker thread.
+CHECKOUT_MAX_INFLIGHT = int(os.environ.get("CHECKOUT_MAX_INFLIGHT", 24))
+CHECKOUT_QUEUE_TIMEOUT = float(os.environ.get("CHECKOUT_QUEUE_TIMEOUT", 2))
+checkout_slots = threading.BoundedSemaphore(CHECKOUT_MAX_INFLIGHT)
+
+# Payment links created in the last CHECKOUT_DEDUP_TTL seconds are reused for
+# identical checkouts (same items, shipping, gift wrap, buyer email and session).
+CHECKOUT_DEDUP_TTL = float(os.environ.get("CHECKOUT_DEDUP_TTL", 600))
+CHECKOUT_DEDUP_MAX = int(os.environ.get("CHECKOUT_DEDUP_MAX", 10000))
+
+# SQUARE_BASE_URL overrides the environment's endpoint, e.g. to use square_stub.py
+SQUARE_BASE_URL = os.environ.get("SQUARE_BASE_URL") or BASE_URLS.get(
+    SQUARE_ENVIRONMENT, BASE_URLS["sandbox"]
+)
+
+# One pooled client for the whole process, reused by every request
+square_client = SquareTransport(
     access_token=SQUARE_ACCESS_TOKEN,
-    environment=SQUARE_ENVIRONMENT,
+    base_url=SQUARE_BASE_URL,
+    api_version=os.environ.get("SQUARE_API_VERSION", DEFAULT_API_VERSION),
+    pool_size=int(os.environ.get("SQUARE_POOL_SIZE", CHECKOUT_MAX_INFLIGHT)),
+    connect_timeout=float(os.environ.get("SQUARE_CONNECT_TIMEOUT", 3.05)),
+    read_timeout=float(os.environ.get("SQUARE_READ_TIMEOUT", 10)),
+    max_retries=int(os.environ.get("SQUARE_MAX_RETRIES", 2)),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.environ.get("SQUARE_BREAKER_FAILURES", 5)),
+        reset_timeout=float(os.environ.get("SQUARE_BREAKER_RESET", 30)),
+    ),
+)
+
+
+# Metrics live in this process only; see gunicorn.conf.py for why enabling
+# them defaults to a single worker. MAGE_METRICS=0 turns /metrics off.
+METRICS_ENABLED = os.environ.get("MAGE_METRICS", "1") != "0"
+
+registry = metrics.Registry()
+REQUESTS = registry.register(
+    metrics.Counter("mage_http_requests_total", "HTTP requests handled", ["route", "method", "status"])
+)
+REQUEST_SECONDS = registry.register(
+    metrics.Histogram("mage_request_duration_seconds", "Total request latency", ["route"])
+)
+LOCAL_SECONDS = registry.register(
+    metrics.Histogram(
+        "mage_local_duration_seconds", "Request latency excluding time spent waiting on Square", ["route"]
+    )
+)
+SQUARE_SECONDS = registry.register(
+    metrics.Histogram(
+        "mage_square_duration_seconds", "Square API call latency, retries included", ["operation"]
+    )
+)
+SQUARE_ERRORS = registry.register(
+    metrics.Counter("mage_square_errors_total", "Failed Square calls by error category", ["category"])
+)
+DEDUP_HITS = registry.register(
+    metrics.Counter("mage_checkout_dedup_hits_total", "Checkouts answered from the payment link cache")
+)
+
+
+def call_square(operation, fn, *args):
+    """Run a Square call, recording its latency and any error categories."""
+    start = time.perf_counter()
+    try:
+        result = fn(*args)
+    except SquareCircuitOpen:
+        SQUARE_ERRORS.inc(category="CIRCUIT_OPEN")
+        raise
+    except SquareUnavailable:
+        SQUARE_ERRORS.inc(category="UNAVAILABLE")
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        g.square_seconds = g.get("square_seconds", 0.0) + elapsed
+        SQUARE_SECONDS.observe(elapsed, operation=operation)
+    if not result.is_success():
+        for error in result.errors or [{}]:
+            SQUARE_ERRORS.inc(category=error.get("category", "UNKNOWN"))
+    return result
+
+
+@app.before_request
+def start_timer():
+    g.start_time = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    elapsed = time.perf_counter() - g.get("start_time", time.perf_counter())
+    REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    REQUEST_SECONDS.observe(elapsed, route=route)
+    LOCAL_SECONDS.observe(max(0.0, elapsed - g.get("square_seconds", 0.0)), route=route)
+    return response
+
+
+class LinkCache:
+    """Checkout URLs by checkout key, expiring after `ttl` seconds."""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.key_locks = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            url, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            return url
+
+    def put(self, key, url):
+        with self.lock:
+            self.entries[key] = (url, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def key_lock(self, key):
+        # Identical checkouts arriving together wait for the first one
+        # instead of each calling Square.
+        with self.lock:
+            lock = self.key_locks.get(key)
+            if lock is None:
+                lock = self.key_locks[key] = threading.Lock()
+            return lock
+
+    def drop_key_lock(self, key, lock):
+        with self.lock:
+            if self.key_locks.get(key) is lock:
+                del self.key_locks[key]
+
+
+link_cache = LinkCache(CHECKOUT_DEDUP_TTL, CHECKOUT_DEDUP_MAX)
+
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+registry.register(
+    metrics.Gauge(
+        "mage_square_circuit_state",
+        "Square circuit breaker state: 0 closed, 1 half-open, 2 open",
+        lambda: CIRCUIT_STATES[square_client.breaker.state],
+    )
 )
 
 
+def normalize_line_items(line_items):
+    """Line items in a canonical order, so the same cart in any order is
+    both hashed and sent to Square identically."""
+    return sorted(
+        line_items,
+        key=lambda item: (item["name"], item["base_price_money"]["amount"], int(item["quantity"])),
+    )
+
+
+def checkout_key(line_items, email, session):
+    """Stable hash of what the buyer is paying for. `line_items` must already
+    be normalized; `session` is the client's per-checkout nonce."""
+    items = [
+        (item["name"], item["base_price_money"]["amount"], int(item["quantity"]))
+        for item in line_items
+    ]
+    normalized = {
+        "items": items,
+        "email": (email or "").strip().lower(),
+        "session": session,
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
 @app.route("/", methods=["GET"])
 def index():
     return jsonify({"status": "ok", "service": "MAGE Payment Backend"})
@@ -31,7 +216,14 @@ def index():
 
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "healthy"})
+    return jsonify({"status": "healthy", "square_circuit": square_client.breaker.state})
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    if not METRICS_ENABLED:
+        return Response("metrics are disabled\n", status=404, mimetype="text/plain")
+    return Response(registry.render(), mimetype=metrics.CONTENT_TYPE)
 
 
 @app.route("/create-checkout", methods=["POST"])
@@ -51,7 +243,8 @@ def create_checkout():
             "name": "...",
             "email": "...",
             "address": "..."
-        }
+        },
+        "checkout_session": "..."   # per-browser-session nonce, for dedup
     }
     
     Response:
@@ -107,11 +300,26 @@ def create_checkout():
                 }
             })
 
-        # Create checkout using Square Checkout API
-        checkout_api = square_client.checkout
-        
-        # Generate unique idempotency key
-        idempotency_key = str(uuid.uuid4())
+        line_items = normalize_line_items(line_items)
+        # Only requests from the same browser session are deduplicated; a
+        # client that sends neither an email nor a session gets its own key.
+        session = str(data.get("checkout_session") or "")[:64]
+        if not session and not customer.get("email"):
+            session = uuid.uuid4().hex
+        key = checkout_key(line_items, customer.get("email"), session)
+        checkout_url = link_cache.get(key)
+        if checkout_url:
+            DEDUP_HITS.inc()
+            return jsonify({"checkout_url": checkout_url})
+
+        # Square dedupes on this key too, which covers duplicates landing on
+        # other worker processes. The time bucket makes a later identical
+        # order (after a completed payment) get a fresh link.
+        if CHECKOUT_DEDUP_TTL > 0:
+            bucket = int(time.time() // CHECKOUT_DEDUP_TTL)
+        else:
+            bucket = uuid.uuid4().hex
+        idempotency_key = f"{key[:48]}-{bucket}"
 
         # Build the order
         order = {
@@ -127,15 +335,39 @@ def create_checkout():
         if customer.get("email"):
             order["pre_populate_buyer_email"] = customer["email"]
 
-        result = checkout_api.create_payment_link(body=order)
+        lock = link_cache.key_lock(key)
+        try:
+            with lock:
+                checkout_url = link_cache.get(key)
+                if checkout_url:
+                    DEDUP_HITS.inc()
+                    return jsonify({"checkout_url": checkout_url})
+                if not checkout_slots.acquire(timeout=CHECKOUT_QUEUE_TIMEOUT):
+                    response = jsonify({"error": "Checkout is busy, please retry"})
+                    response.headers["Retry-After"] = "1"
+                    return response, 503
+                try:
+                    result = call_square(
+                        "create_payment_link", square_client.create_payment_link, order
+                    )
+                finally:
+                    checkout_slots.release()
+                if result.is_success():
+                    checkout_url = result.body.get("payment_link", {}).get("url", "")
+                    if checkout_url:
+                        link_cache.put(key, checkout_url)
+        finally:
+            link_cache.drop_key_lock(key, lock)
 
         if result.is_success():
-            checkout_url = result.body.get("payment_link", {}).get("url", "")
             return jsonify({"checkout_url": checkout_url})
         else:
             errors = result.errors
             return jsonify({"error": "Failed to create checkout", "details": errors}), 500
 
+    except SquareUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -0,0 +1,27 @@
+"""
+Gunicorn settings, picked up automatically by `gunicorn app:app`.
+
+Checkout time is almost entirely spent waiting on Square, so each worker
+serves requests from a thread pool (gthread) instead of one at a time.
+Gunicorn binds to $PORT when it is set (Render does this).
+
+/metrics is served from in-process counters, so with metrics enabled
+(MAGE_METRICS, on by default) a single worker is the default: with several,
+each scrape would only see the worker that answered it.
+"""
+
+import os
+import sys
+
+metrics_enabled = os.environ.get("MAGE_METRICS", "1") != "0"
+workers = int(os.environ.get("WEB_CONCURRENCY", 1 if metrics_enabled else 2))
+if metrics_enabled and workers > 1:
+    print(
+        f"warning: {workers} workers with MAGE_METRICS on; /metrics will only "
+        "report the worker answering each scrape",
+        file=sys.stderr,
+    )
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+keepalive = 5
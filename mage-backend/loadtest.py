@@ -0,0 +1,158 @@
+"""
+Burst load test for /create-checkout against the local Square stub.
+
+Starts square_stub.py in-process, then for each serving mode launches
+`gunicorn app:app` pointed at the stub, fires --requests checkouts with
+--concurrency clients and prints throughput, latency percentiles and status
+counts as JSON:
+
+    python loadtest.py --modes sync,gthread --requests 2000 --concurrency 200
+
+With --url the given server is hit directly (start the stub yourself and set
+SQUARE_BASE_URL on that server).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from square_stub import start_stub
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Worker layouts compared by --modes; both use the same number of processes.
+MODES = {
+    "sync": ["--worker-class", "sync", "--threads", "1"],
+    "gthread": ["--worker-class", "gthread", "--threads", "32"],
+}
+
+CHECKOUT_BODY = {
+    "cart": [{"sku": "signature", "name": "Signature Deck", "price": 10, "qty": 1}],
+    "shipping": 8,
+    "gift_wrap": False,
+    "customer": {"name": "Load Test", "email": "load@example.com"},
+}
+
+
+def checkout(url, index):
+    # A distinct buyer per request, so every call is a real checkout.
+    body = dict(CHECKOUT_BODY, customer={"email": f"load{index}@example.com"})
+    request = urllib.request.Request(
+        url + "/create-checkout",
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    except OSError:
+        status = "error"
+    return status, time.perf_counter() - start
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run_burst(url, requests, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: checkout(url, i), range(requests)))
+    elapsed = time.perf_counter() - start
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ok = sorted(latency for status, latency in results if status == 200)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_sec": round(elapsed, 3),
+        "ok_per_sec": round(len(ok) / elapsed, 1) if elapsed > 0 else None,
+        "statuses": statuses,
+        "p50_ms": round(percentile(ok, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(ok, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(ok, 0.99) * 1000, 1),
+    }
+
+
+def wait_ready(url, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/health", timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def run_mode(mode, args, stub_url):
+    url = f"http://127.0.0.1:{args.port}"
+    env = dict(
+        os.environ,
+        SQUARE_BASE_URL=stub_url,
+        SQUARE_ACCESS_TOKEN="loadtest",
+        SQUARE_LOCATION_ID="LOADTEST",
+    )
+    cmd = [
+        sys.executable, "-m", "gunicorn", "app:app",
+        "--bind", f"127.0.0.1:{args.port}",
+        "--workers", str(args.workers),
+        *MODES[mode],
+    ]
+    proc = subprocess.Popen(cmd, cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(url):
+            return {"mode": mode, "error": "server did not start"}
+        return dict(mode=mode, workers=args.workers, **run_burst(url, args.requests, args.concurrency))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /create-checkout against a fake Square.")
+    parser.add_argument("--url", help="Existing server to hit instead of spawning gunicorn")
+    parser.add_argument("--modes", default="sync,gthread", help=f"Comma list of {sorted(MODES)}")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=2, help="Gunicorn processes per mode")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--square-latency", type=float, default=0.3, help="Stub seconds per call")
+    parser.add_argument("--square-fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.url:
+        print(json.dumps([run_burst(args.url.rstrip("/"), args.requests, args.concurrency)], indent=2))
+        return 0
+
+    stub = start_stub(0, args.square_latency, args.square_fail_rate)
+    stub_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    results = []
+    for mode in args.modes.split(","):
+        mode = mode.strip()
+        if mode not in MODES:
+            print(f"unknown mode {mode!r}", file=sys.stderr)
+            return 1
+        results.append(run_mode(mode, args, stub_url))
+    stub.shutdown()
+    for result in results:
+        result["square_latency"] = args.square_latency
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Local stand-in for the Square payment-links API.
+
+Answers POST /v2/online-checkout/payment-links like Square does (one link per
+idempotency key) with configurable latency and failure rate, so the backend
+can be run and load-tested without Square:
+
+    python square_stub.py --port 9090 --latency 0.2 --fail-rate 0.05
+    SQUARE_BASE_URL=http://127.0.0.1:9090 python app.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAYMENT_LINKS_PATH = "/v2/online-checkout/payment-links"
+
+
+class StubState:
+    def __init__(self, latency=0.0, fail_rate=0.0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.links = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like Square
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        state = self.server.state
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        with state.lock:
+            state.requests += 1
+        if self.path != PAYMENT_LINKS_PATH:
+            self._send(404, {"errors": [{"category": "INVALID_REQUEST_ERROR", "code": "NOT_FOUND"}]})
+            return
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            self._send(401, {"errors": [{"category": "AUTHENTICATION_ERROR", "code": "UNAUTHORIZED"}]})
+            return
+        if state.latency:
+            time.sleep(state.latency)
+        if random.random() < state.fail_rate:
+            self._send(503, {"errors": [{"category": "API_ERROR", "code": "SERVICE_UNAVAILABLE"}]})
+            return
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            self._send(400, {"errors": [{"category": "INVALID_REQUEST_ERROR", "code": "BAD_REQUEST"}]})
+            return
+        key = body.get("idempotency_key") or uuid.uuid4().hex
+        with state.lock:
+            link = state.links.get(key)
+            if link is None:
+                link_id = uuid.uuid4().hex[:16].upper()
+                link = {
+                    "id": link_id,
+                    "version": 1,
+                    "order_id": uuid.uuid4().hex[:24].upper(),
+                    "url": f"http://{self.server.server_address[0]}:{self.server.server_address[1]}/checkout/{link_id}",
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                }
+                state.links[key] = link
+        self._send(200, {"payment_link": link})
+
+
+def start_stub(port=0, latency=0.0, fail_rate=0.0):
+    """Serve the stub on a background thread; returns the server (see
+    `server.server_address`, `server.state`, `server.shutdown()`)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(latency, fail_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Square payment-links API.")
+    parser.add_argument("--port", type=int, default=9090)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction answered with 503")
+    args = parser.parse_args()
+
+    server = start_stub(args.port, args.latency, args.fail_rate)
+    print(f"Square stub on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
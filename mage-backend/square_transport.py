@@ -0,0 +1,184 @@
+"""
+HTTP transport for the Square API.
+
+One pooled keep-alive session is shared by all requests. Every call has
+connect/read timeouts, transient failures are retried a bounded number of
+times with jittered backoff, and a circuit breaker fails fast while Square
+is unreachable instead of tying up workers. Point SQUARE_BASE_URL at
+square_stub.py to run without Square.
+"""
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URLS = {
+    "production": "https://connect.squareup.com",
+    "sandbox": "https://connect.squareupsandbox.com",
+}
+
+# Square-Version header sent with every call. This is the API version the
+# squareup SDK formerly used here (37.1.1.20240718) pinned, so request and
+# response shapes are unchanged; override with SQUARE_API_VERSION.
+DEFAULT_API_VERSION = "2024-07-18"
+
+# Statuses worth another attempt; payment-link creation carries an
+# idempotency key, so repeating the POST cannot create a second link.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SquareUnavailable(Exception):
+    """Square could not be reached (timeouts, 5xx after retries, open circuit)."""
+
+
+class SquareCircuitOpen(SquareUnavailable):
+    """Rejected without calling Square because the circuit is open."""
+
+
+class SquareResponse:
+    """Subset of the SDK's ApiResponse used by the handlers."""
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+        self.errors = body.get("errors", [])
+
+    def is_success(self):
+        return 200 <= self.status_code < 300 and not self.errors
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; after
+    `reset_timeout` seconds one trial call is let through (half-open)."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class SquareTransport:
+    def __init__(
+        self,
+        access_token,
+        base_url,
+        api_version=DEFAULT_API_VERSION,
+        pool_size=10,
+        connect_timeout=3.05,
+        read_timeout=10.0,
+        max_retries=2,
+        backoff_base=0.2,
+        backoff_max=2.0,
+        breaker=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {
+                "Authorization": f"Bearer {access_token}",
+                "Square-Version": api_version,
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            }
+        )
+
+    def _backoff(self, attempt, retry_after=None):
+        # Full jitter keeps a burst of failed checkouts from retrying in step.
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            try:
+                delay = max(delay, min(self.backoff_max, float(retry_after)))
+            except ValueError:
+                pass
+        time.sleep(delay)
+
+    def post(self, path, body):
+        if not self.breaker.allow():
+            raise SquareCircuitOpen("Square circuit is open, failing fast")
+        # Anything that escapes without a response (including unexpected
+        # exceptions) counts as a failure, so a half-open trial never sticks.
+        succeeded = False
+        try:
+            response = self._send(self.base_url + path, body)
+            succeeded = True
+        finally:
+            if succeeded:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        return SquareResponse(response.status_code, payload)
+
+    def _send(self, url, body):
+        last_error = None
+        retry_after = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._backoff(attempt - 1, retry_after)
+                retry_after = None
+            try:
+                response = self.session.post(url, json=body, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                last_error = f"{type(exc).__name__}: {exc}"
+                continue
+            except requests.RequestException as exc:
+                raise SquareUnavailable(f"Square request failed ({type(exc).__name__}: {exc})") from exc
+            if response.status_code in RETRY_STATUSES:
+                last_error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+                continue
+            return response
+        raise SquareUnavailable(
+            f"Square unavailable after {self.max_retries + 1} attempts ({last_error})"
+        )
+
+    def create_payment_link(self, body):
+        return self.post("/v2/online-checkout/payment-links", body)
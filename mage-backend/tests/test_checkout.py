@@ -0,0 +1,79 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+pytest.importorskip("requests")
+
+import app as backend  # noqa: E402
+from square_transport import SquareResponse  # noqa: E402
+
+CART = [
+    {"sku": "signature", "name": "Signature Deck", "price": 10, "qty": 2},
+    {"sku": "mini", "name": "Mini Deck", "price": 6.5, "qty": 1},
+]
+
+
+@pytest.fixture
+def square(monkeypatch):
+    sent = []
+
+    def create_payment_link(order):
+        sent.append(order)
+        return SquareResponse(200, {"payment_link": {"url": f"https://square.test/{len(sent)}"}})
+
+    monkeypatch.setattr(backend.square_client, "create_payment_link", create_payment_link)
+    monkeypatch.setattr(
+        backend, "link_cache", backend.LinkCache(backend.CHECKOUT_DEDUP_TTL, backend.CHECKOUT_DEDUP_MAX)
+    )
+    return sent
+
+
+@pytest.fixture
+def client():
+    return backend.app.test_client()
+
+
+def checkout(client, cart, email=None, session=None):
+    body = {"cart": cart, "shipping": 8}
+    if email:
+        body["customer"] = {"email": email}
+    if session:
+        body["checkout_session"] = session
+    response = client.post("/create-checkout", json=body)
+    assert response.status_code == 200
+    return response.get_json()["checkout_url"]
+
+
+def test_key_matches_sent_body(client, square):
+    checkout(client, CART, email="Buyer@Example.com", session="s1")
+    order = square[0]
+    items = order["order"]["line_items"]
+    assert items == backend.normalize_line_items(items)
+    key = backend.checkout_key(items, "Buyer@Example.com", "s1")
+    assert order["idempotency_key"].startswith(key[:48] + "-")
+
+
+def test_reordered_cart_hits_cache(client, square):
+    first = checkout(client, CART, email="buyer@example.com", session="s1")
+    second = checkout(client, list(reversed(CART)), email="buyer@example.com", session="s1")
+    assert first == second
+    assert len(square) == 1
+
+
+def test_sessions_without_email_are_not_merged(client, square):
+    first = checkout(client, CART, session="s1")
+    second = checkout(client, CART, session="s2")
+    assert first != second
+    assert len(square) == 2
+    assert square[0]["idempotency_key"] != square[1]["idempotency_key"]
+
+
+def test_anonymous_checkouts_get_their_own_key(client, square):
+    checkout(client, CART)
+    checkout(client, CART)
+    assert len(square) == 2
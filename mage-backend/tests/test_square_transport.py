@@ -0,0 +1,87 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+requests = pytest.importorskip("requests")
+
+import square_transport  # noqa: E402
+from square_transport import CircuitBreaker, SquareTransport, SquareUnavailable  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(square_transport.time, "monotonic", clock)
+    return clock
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30.0)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_allows_one_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    breaker.record_failure()
+    clock.now += 29.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_breaker_trial_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    breaker.record_failure()
+    clock.now += 30.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    assert breaker.allow()
+
+
+def test_breaker_trial_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    breaker.record_failure()
+    clock.now += 30.0
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock.now += 30.0
+    assert breaker.allow()
+
+
+def test_unexpected_request_error_releases_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    transport = SquareTransport("token", "http://square.invalid", breaker=breaker, max_retries=0)
+
+    def broken_post(*args, **kwargs):
+        raise requests.exceptions.InvalidURL("bad url")
+
+    transport.session.post = broken_post
+    breaker.record_failure()
+    clock.now += 30.0
+    with pytest.raises(SquareUnavailable):
+        transport.post("/v2/online-checkout/payment-links", {})
+    assert not breaker.trial_running
+    assert breaker.state == "open"
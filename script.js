@@ -12,6 +12,17 @@ document.addEventListener('DOMContentLoaded', () => {
     try { localStorage.setItem('mage_cart', JSON.stringify(items)); } catch (e) {}
     updateCartSummary();
   }
+  // Per-tab nonce so the backend only merges duplicate checkouts from this session.
+  function getCheckoutSession() {
+    try {
+      let id = sessionStorage.getItem('mage_checkout_session');
+      if (!id) {
+        id = Math.random().toString(36).slice(2) + Date.now().toString(36);
+        sessionStorage.setItem('mage_checkout_session', id);
+      }
+      return id;
+    } catch (e) { return ''; }
+  }
 
   // ----- Nav -----
   const nav = document.querySelector('.nav');
@@ -393,16 +404,26 @@ document.addEventListener('DOMContentLoaded', () => {
       }
 
       try {
-        const response = await fetch(`${PAYMENT_API_URL}/create-checkout`, {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({
-            cart: cart,
-            shipping: shipping,
-            gift_wrap: giftWrap,
-            customer: customer,
-          }),
+        const payload = JSON.stringify({
+          cart: cart,
+          shipping: shipping,
+          gift_wrap: giftWrap,
+          customer: customer,
+          checkout_session: getCheckoutSession(),
         });
+        // The backend sheds load with 503 + Retry-After during drops; retry up to three times.
+        const maxRetries = 3;
+        let response;
+        for (let attempt = 0; ; attempt++) {
+          response = await fetch(`${PAYMENT_API_URL}/create-checkout`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: payload,
+          });
+          if (response.status !== 503 || attempt === maxRetries) break;
+          const wait = Number(response.headers.get('Retry-After')) || 1;
+          await new Promise(resolve => setTimeout(resolve, wait * 1000 * (attempt + 1)));
+        }
 
         const data = await response.json();
 
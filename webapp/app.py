@@ -1,44 +1,612 @@
-import io
+import contextlib
+import hashlib
 import json
 import os
-import subprocess
+import shutil
+import sqlite3
+import sys
 import tempfile
+import threading
+import time
+import uuid
 import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
-from flask import Flask, Response, render_template, request, send_file
+from flask import Flask, Response, jsonify, render_template, request, send_file
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "auto-editor"))
+
+import auto_editor  # noqa: E402
 
 
 app = Flask(__name__)
 
+# Renders run on a bounded pool so a burst of uploads cannot start an
+# unbounded number of ffmpeg processes; beyond MAX_PENDING jobs new
+# submissions are refused.
+RENDER_WORKERS = int(os.environ.get("EDITOPIA_RENDER_WORKERS", "2"))
+MAX_PENDING = int(os.environ.get("EDITOPIA_MAX_PENDING", "20"))
+JOB_TTL = float(os.environ.get("EDITOPIA_JOB_TTL", "3600"))
+# How often expired jobs are removed even when no new jobs arrive.
+JOB_SWEEP_INTERVAL = 60.0
 
-def run_cmd(cmd):
-    proc = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        encoding="utf-8",
-    )
-    out, err = proc.communicate()
-    return proc.returncode, out, err
+# Upload limits; MAX_CONTENT_LENGTH makes Flask answer 413 before parsing.
+MAX_UPLOAD_BYTES = int(os.environ.get("EDITOPIA_MAX_UPLOAD_MB", "1024")) * 1024 * 1024
+MAX_ZIP_ENTRIES = int(os.environ.get("EDITOPIA_MAX_ZIP_ENTRIES", "5000"))
+MAX_ZIP_BYTES = int(os.environ.get("EDITOPIA_MAX_ZIP_MB", "2048")) * 1024 * 1024
+MAX_JSON_BYTES = 8 * 1024 * 1024
+ASSET_DIR = os.environ.get(
+    "EDITOPIA_ASSET_DIR", os.path.join(os.path.expanduser("~"), ".cache", "editopia", "assets")
+)
+ASSET_MAX_BYTES = int(os.environ.get("EDITOPIA_ASSET_MAX_MB", "10240")) * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+SPOOL_BYTES = 16 * 1024 * 1024
+RESULT_CACHE_DIR = os.environ.get(
+    "EDITOPIA_RESULT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "editopia", "results")
+)
+RESULT_CACHE_BYTES = int(os.environ.get("EDITOPIA_RESULT_CACHE_MB", "4096")) * 1024 * 1024
+# Part of every render key; bump when auto_editor output changes for the
+# same inputs so stale cached videos are not served.
+RENDER_KEY_VERSION = 1
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+
+class RenderJob:
+    def __init__(self, workdir, config, assets, key):
+        self.id = uuid.uuid4().hex
+        self.workdir = workdir
+        self.config = config
+        self.assets = list(assets)
+        self.key = key
+        # Identical requests submitted while this one renders.
+        self.followers = []
+        self.status = "queued"
+        self.stage = "queued"
+        self.message = ""
+        self.progress = 0.0
+        self.error = None
+        self.finished_at = None
+
+    def on_event(self, event):
+        for job in [self] + self.followers:
+            job.stage = event.stage
+            job.message = event.message
+            if event.fraction is not None:
+                job.progress = event.fraction
+
+    def finish(self, status, error=None):
+        self.status = status
+        self.error = error
+        if status == "done":
+            self.progress = 1.0
+        self.finished_at = time.time()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "message": self.message,
+            "progress": self.progress,
+            "error": self.error,
+        }
+
+
+class ResultCache:
+    """Finished MP4s keyed by render key, evicted LRU by mtime."""
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.root, f"{key}.mp4")
+
+    def lookup(self, key):
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def store(self, key, output):
+        if os.path.getsize(output) > self.max_bytes:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".part")
+        os.close(fd)
+        try:
+            shutil.copyfile(output, tmp)
+            os.replace(tmp, self.path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".mp4"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def link_output(src, job):
+    try:
+        os.link(src, job.config.output)
+    except OSError:
+        shutil.copyfile(src, job.config.output)
+
+
+class JobQueue:
+    def __init__(self, workers, max_pending, results):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.max_pending = max_pending
+        self.results = results
+        self.jobs = {}
+        # render key -> job currently rendering it (single-flight)
+        self.inflight = {}
+        self.lock = threading.Lock()
+        threading.Thread(target=self._sweep_forever, daemon=True).start()
+
+    def submit(self, job):
+        # The cache is read outside the lock (link_output may copy a whole
+        # video). An entry evicted between lookup and link is just a miss.
+        cached = self.results.lookup(job.key)
+        if cached is not None:
+            try:
+                link_output(cached, job)
+            except OSError:
+                cached = None
+        self._sweep()
+        with self.lock:
+            if cached is not None:
+                job.stage = "cached"
+                job.finish("done")
+                self.jobs[job.id] = job
+                return True
+            leader = self.inflight.get(job.key)
+            if leader is not None:
+                job.status = leader.status
+                job.stage = "waiting for identical render"
+                leader.followers.append(job)
+                self.jobs[job.id] = job
+                return True
+            pending = sum(1 for j in self.inflight.values() if j.status in ("queued", "running"))
+            if pending >= self.max_pending:
+                return False
+            self.jobs[job.id] = job
+            self.inflight[job.key] = job
+        self.executor.submit(self._run, job)
+        return True
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def discard(self, job_id):
+        with self.lock:
+            job = self.jobs.pop(job_id, None)
+        if job is not None:
+            release_job(job)
+
+    def _run(self, job):
+        job.status = "running"
+        for follower in job.followers:
+            follower.status = "running"
+        try:
+            auto_editor.render_script_video(job.config, on_event=job.on_event)
+            if not os.path.exists(job.config.output):
+                raise RuntimeError("no output produced")
+            try:
+                self.results.store(job.key, job.config.output)
+            except OSError:
+                # The render succeeded; it just is not cached.
+                pass
+            status, error = "done", None
+        except Exception as exc:
+            status, error = "failed", str(exc)
+        with self.lock:
+            self.inflight.pop(job.key, None)
+            followers = job.followers
+            job.followers = []
+        for follower in followers:
+            if status == "done":
+                try:
+                    link_output(job.config.output, follower)
+                except OSError as exc:
+                    # The follower was discarded while waiting.
+                    follower.finish("failed", str(exc))
+                    continue
+            follower.finish(status, error)
+        job.finish(status, error)
+
+    def _sweep(self):
+        # Drop finished jobs (and their files) once they are older than JOB_TTL.
+        now = time.time()
+        with self.lock:
+            expired = [
+                self.jobs.pop(job_id)
+                for job_id, job in list(self.jobs.items())
+                if job.finished_at is not None and now - job.finished_at > JOB_TTL
+            ]
+        for job in expired:
+            release_job(job)
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(JOB_SWEEP_INTERVAL)
+            try:
+                self._sweep()
+            except Exception:
+                app.logger.exception("job sweep failed")
+
+
+def release_job(job):
+    shutil.rmtree(job.workdir, ignore_errors=True)
+    asset_store.release(job.assets)
+
+
+job_queue = JobQueue(RENDER_WORKERS, MAX_PENDING, ResultCache(RESULT_CACHE_DIR, RESULT_CACHE_BYTES))
+
+
+class UploadRejected(ValueError):
+    pass
+
+
+class AssetStore:
+    """Content-addressed files shared by all requests.
+
+    Files live under ``<root>/<sha[:2]>/<sha>``. An SQLite index keeps each
+    file's size, original name, the number of live jobs holding it and when
+    it was last used; unreferenced files are evicted least-recently-used
+    once the store exceeds ``max_bytes``. A zip pack is recorded as a
+    manifest of member paths and digests, keyed by the zip's own hash.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.db_path = os.path.join(root, "assets.sqlite3")
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS assets ("
+                " digest TEXT PRIMARY KEY, size INTEGER, name TEXT,"
+                " refs INTEGER NOT NULL DEFAULT 0, last_used REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS packs ("
+                " digest TEXT PRIMARY KEY, manifest TEXT, last_used REAL)"
+            )
+            # Jobs do not outlive the process, so neither do their references.
+            conn.execute("UPDATE assets SET refs = 0")
+        self.evict()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
 
+    def put_stream(self, stream, limit, label, name=None):
+        """Store a stream and return its digest with one reference held on
+        it, which the caller hands back through ``release``."""
+        digest = hashlib.sha256()
+        size = 0
+        # Typical images and dictionaries stay in memory until hashed, so a
+        # repeated upload costs no disk writes at all.
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, dir=self.root) as spool:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > limit:
+                    raise UploadRejected(f"{label} exceeds {limit} bytes")
+                digest.update(chunk)
+                spool.write(chunk)
+            key = digest.hexdigest()
+            final = self.path(key)
+            # The existence check and the reference are taken under the lock
+            # evict() holds, so a file seen here cannot be deleted before use.
+            if self._hold(key, size, name, None):
+                return key
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            spool.seek(0)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(final), suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    shutil.copyfileobj(spool, out, CHUNK_SIZE)
+                self._hold(key, size, name, tmp)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        return key
 
-def save_upload(file_storage, target_path):
-    file_storage.save(target_path)
-    return target_path
+    def _hold(self, key, size, name, tmp):
+        # Without tmp, only succeeds when the file is already stored; with
+        # tmp, moves it into place (identical content if a racing upload got
+        # there first). Either way the reference is counted in the same step.
+        final = self.path(key)
+        with self.lock, contextlib.closing(self._connect()) as conn, conn:
+            if tmp is not None:
+                os.replace(tmp, final)
+            elif not os.path.exists(final):
+                return False
+            conn.execute(
+                "INSERT INTO assets (digest, size, name, refs, last_used) VALUES (?, ?, ?, 1, ?)"
+                " ON CONFLICT(digest) DO UPDATE SET refs = refs + 1, last_used = excluded.last_used",
+                (key, size, name or key, time.time()),
+            )
+        return True
 
+    def name(self, digest):
+        with contextlib.closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT name FROM assets WHERE digest = ?", (digest,)).fetchone()
+        return row[0] if row else digest
 
-def extract_zip(zip_path, target_dir):
-    with zipfile.ZipFile(zip_path, "r") as zf:
-        zf.extractall(target_dir)
+    def _present(self, conn, digests):
+        for digest in digests:
+            row = conn.execute("SELECT 1 FROM assets WHERE digest = ?", (digest,)).fetchone()
+            if row is None or not os.path.exists(self.path(digest)):
+                return False
+        return True
 
+    def info(self, digest):
+        with self.lock, contextlib.closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT size, name FROM assets WHERE digest = ?", (digest,)
+            ).fetchone()
+            if row is not None and os.path.exists(self.path(digest)):
+                return {"sha256": digest, "kind": "file", "size": row[0], "name": row[1]}
+            row = conn.execute(
+                "SELECT manifest FROM packs WHERE digest = ?", (digest,)
+            ).fetchone()
+            if row is not None:
+                manifest = json.loads(row[0])
+                if self._present(conn, {d for _, d in manifest}):
+                    return {"sha256": digest, "kind": "pack", "entries": len(manifest)}
+        return None
 
-def write_json_file(file_storage, target_path):
-    content = file_storage.read().decode("utf-8")
-    json.loads(content)
-    with open(target_path, "w", encoding="utf-8") as f:
-        f.write(content)
-    file_storage.stream.seek(0)
+    def acquire(self, digests):
+        # Checked and counted under one lock so eviction cannot slip between.
+        digests = sorted(set(digests))
+        with self.lock, contextlib.closing(self._connect()) as conn, conn:
+            if not self._present(conn, digests):
+                return False
+            now = time.time()
+            conn.executemany(
+                "UPDATE assets SET refs = refs + 1, last_used = ? WHERE digest = ?",
+                [(now, d) for d in digests],
+            )
+        return True
+
+    def release(self, digests):
+        # One decrement per entry: callers list a digest once per reference.
+        with self.lock, contextlib.closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "UPDATE assets SET refs = MAX(refs - 1, 0) WHERE digest = ?",
+                [(d,) for d in sorted(digests)],
+            )
+        self.evict()
+
+    def put_pack(self, digest, manifest):
+        with self.lock, contextlib.closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO packs (digest, manifest, last_used) VALUES (?, ?, ?)",
+                (digest, json.dumps(manifest), time.time()),
+            )
+
+    def acquire_pack(self, digest):
+        with self.lock, contextlib.closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT manifest FROM packs WHERE digest = ?", (digest,)
+            ).fetchone()
+            if row is None:
+                return None
+            manifest = json.loads(row[0])
+            members = sorted({d for _, d in manifest})
+            if not self._present(conn, members):
+                # A member was evicted; the pack has to be uploaded again.
+                conn.execute("DELETE FROM packs WHERE digest = ?", (digest,))
+                return None
+            now = time.time()
+            conn.execute("UPDATE packs SET last_used = ? WHERE digest = ?", (now, digest))
+            conn.executemany(
+                "UPDATE assets SET refs = refs + 1, last_used = ? WHERE digest = ?",
+                [(now, d) for d in members],
+            )
+        return manifest
+
+    def evict(self):
+        with self.lock, contextlib.closing(self._connect()) as conn, conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM assets").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = conn.execute(
+                "SELECT digest, size FROM assets WHERE refs = 0 ORDER BY last_used"
+            ).fetchall()
+            for digest, size in rows:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self.path(digest))
+                except FileNotFoundError:
+                    pass
+                conn.execute("DELETE FROM assets WHERE digest = ?", (digest,))
+                total -= size
+
+    def link(self, key, target_path):
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        try:
+            os.link(self.path(key), target_path)
+        except OSError:
+            shutil.copyfile(self.path(key), target_path)
+        return target_path
+
+
+asset_store = AssetStore(ASSET_DIR, ASSET_MAX_BYTES)
+
+
+def safe_member_path(name):
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".")]
+    if not parts or ".." in parts or ":" in parts[0]:
+        return None
+    return os.path.join(*parts)
+
+
+def hash_stream(stream):
+    digest = hashlib.sha256()
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_pack(file_storage, held):
+    # The member list lives in the central directory at the end of the
+    # archive, so it is read from the upload werkzeug already spooled; the
+    # zip itself is never copied and members are streamed one at a time.
+    try:
+        zf = zipfile.ZipFile(file_storage.stream)
+    except zipfile.BadZipFile as exc:
+        raise UploadRejected(f"bg_zip is not a valid zip file: {exc}") from exc
+    manifest = []
+    seen = set()
+    with zf:
+        members = [m for m in zf.infolist() if not m.is_dir()]
+        if len(members) > MAX_ZIP_ENTRIES:
+            raise UploadRejected(f"bg_zip has more than {MAX_ZIP_ENTRIES} entries")
+        total = sum(m.file_size for m in members)
+        if total > MAX_ZIP_BYTES:
+            raise UploadRejected(f"bg_zip expands to more than {MAX_ZIP_BYTES} bytes")
+        for member in members:
+            rel = safe_member_path(member.filename)
+            if rel is None or not rel.lower().endswith(auto_editor.IMAGE_EXTS):
+                continue
+            try:
+                with zf.open(member) as src:
+                    # The declared size is the limit, so a member that inflates
+                    # beyond its header is rejected instead of filling the disk.
+                    key = asset_store.put_stream(
+                        src, member.file_size, member.filename, os.path.basename(rel)
+                    )
+            except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError) as exc:
+                # Bad CRC, truncated or corrupt data, unsupported compression.
+                raise UploadRejected(f"bg_zip member {member.filename} is unreadable: {exc}") from exc
+            except RuntimeError as exc:
+                # zipfile raises this for encrypted members.
+                raise UploadRejected(f"bg_zip member {member.filename}: {exc}") from exc
+            # put_stream took a reference; keep one per distinct member.
+            if key in seen:
+                asset_store.release([key])
+            else:
+                seen.add(key)
+                held.append(key)
+            manifest.append([rel, key])
+    return manifest
+
+
+def attach_pack(target_dir, held, sources):
+    """Link the bg_zip images into target_dir, from an upload or by hash."""
+    upload = request.files.get("bg_zip")
+    key = request.form.get("bg_zip_sha256", "").strip().lower()
+    if upload and upload.filename:
+        key = hash_stream(upload.stream)
+        upload.stream.seek(0)
+        manifest = asset_store.acquire_pack(key)
+        if manifest is None:
+            manifest = extract_pack(upload, held)
+            asset_store.put_pack(key, manifest)
+        else:
+            held.extend({d for _, d in manifest})
+    elif key:
+        manifest = asset_store.acquire_pack(key)
+        if manifest is None:
+            raise UploadRejected(f"unknown asset {key}, upload bg_zip again")
+        held.extend({d for _, d in manifest})
+    else:
+        return None
+    sources["bg_zip"] = key
+    os.makedirs(target_dir, exist_ok=True)
+    for rel, digest in manifest:
+        asset_store.link(digest, os.path.join(target_dir, rel))
+    return target_dir
+
+
+def upload_ext(filename):
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if 1 < len(ext) <= 10 and ext[1:].isalnum() else ""
+
+
+def attach_file(field, target_dir, held, sources, name=None, limit=None):
+    """Link one uploaded file into target_dir, from an upload or by hash.
+
+    The link is named after the field (``bg_image.png``), never the client's
+    file name, so an upload cannot land on another input or the output.
+    """
+    upload = request.files.get(field)
+    key = request.form.get(f"{field}_sha256", "").strip().lower()
+    if upload and upload.filename:
+        key = asset_store.put_stream(
+            upload.stream,
+            limit or MAX_UPLOAD_BYTES,
+            upload.filename,
+            os.path.basename(upload.filename),
+        )
+        ext = upload_ext(upload.filename)
+    elif key:
+        if not asset_store.acquire([key]):
+            raise UploadRejected(f"unknown asset {key}, upload {field} again")
+        ext = upload_ext(asset_store.name(key))
+    else:
+        return None
+    held.append(key)
+    sources[field] = key
+    return asset_store.link(key, os.path.join(target_dir, name or field + ext))
+
+
+def render_key(config, script_text, sources):
+    # Parsed values, not raw strings, so "6" and "6.0" share a render.
+    params = {
+        "script": script_text,
+        "bg_color": config.bg_color.lower(),
+        "cps": config.cps,
+        "subtitle_max_len": config.subtitle_max_len,
+        "bgm_volume": config.bgm_volume,
+        "voice_volume": config.voice_volume,
+        "category_boost": config.category_boost,
+        "tag_boost": config.tag_boost,
+    }
+    payload = {"version": RENDER_KEY_VERSION, "params": params, "assets": sources}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def attach_json(field, target_dir, held, sources, name):
+    path = attach_file(field, target_dir, held, sources, name, MAX_JSON_BYTES)
+    if path is not None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                json.load(f)
+        except ValueError as exc:
+            raise UploadRejected(f"{field} is not valid JSON: {exc}") from exc
+    return path
 
 
 @app.route("/", methods=["GET"])
@@ -60,88 +628,124 @@ def generate():
     tag_boost = request.form.get("tag_boost", "2.0").strip()
     subtitle_max_len = request.form.get("subtitle_max_len", "22").strip()
 
-    bg_zip = request.files.get("bg_zip")
-    bg_image = request.files.get("bg_image")
-    bgm_file = request.files.get("bgm_file")
-    keyword_dict = request.files.get("keyword_dict")
-    category_map = request.files.get("category_map")
-    image_tags = request.files.get("image_tags")
+    tmpdir = tempfile.mkdtemp(prefix="editopia-")
+    # Assets this request holds a reference on; handed to the job on submit.
+    held = []
+    # Upload field -> sha256, part of the render key.
+    sources = {}
+
+    def abandon():
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        asset_store.release(held)
 
-    with tempfile.TemporaryDirectory() as tmpdir:
+    try:
         script_path = os.path.join(tmpdir, "script.txt")
         with open(script_path, "w", encoding="utf-8") as f:
             f.write(script_text)
 
-        cmd = [
-            os.environ.get("PYTHON", "python"),
-            os.path.join("auto-editor", "auto_editor.py"),
-            "--script",
-            script_path,
-            "--bg-color",
-            bg_color,
-            "--cps",
-            cps,
-            "--subtitle-max-len",
-            subtitle_max_len,
-            "--bgm-volume",
-            bgm_volume,
-            "--voice-volume",
-            voice_volume,
-            "--category-boost",
-            category_boost,
-            "--tag-boost",
-            tag_boost,
-        ]
-
-        if bg_zip and bg_zip.filename:
-            zip_path = os.path.join(tmpdir, "images.zip")
-            save_upload(bg_zip, zip_path)
-            img_dir = os.path.join(tmpdir, "images")
-            os.makedirs(img_dir, exist_ok=True)
-            extract_zip(zip_path, img_dir)
-            cmd += ["--bg-dir", img_dir]
-
-        if bg_image and bg_image.filename:
-            img_path = os.path.join(tmpdir, bg_image.filename)
-            save_upload(bg_image, img_path)
-            cmd += ["--bg-image", img_path]
-
-        if bgm_file and bgm_file.filename:
-            bgm_path = os.path.join(tmpdir, bgm_file.filename)
-            save_upload(bgm_file, bgm_path)
-            cmd += ["--bgm", bgm_path]
-
-        if keyword_dict and keyword_dict.filename:
-            keyword_path = os.path.join(tmpdir, "keywords.json")
-            write_json_file(keyword_dict, keyword_path)
-            cmd += ["--keyword-dict", keyword_path]
-
-        if category_map and category_map.filename:
-            category_path = os.path.join(tmpdir, "categories.json")
-            write_json_file(category_map, category_path)
-            cmd += ["--category-map", category_path]
-
-        if image_tags and image_tags.filename:
-            tags_path = os.path.join(tmpdir, "image-tags.json")
-            write_json_file(image_tags, tags_path)
-            cmd += ["--image-tags", tags_path]
-
-        output_path = os.path.join(tmpdir, "output.mp4")
-        cmd += ["--output", output_path]
-
-        code, _, err = run_cmd(cmd)
-        if code != 0 or not os.path.exists(output_path):
-            return Response(f"generation failed: {err}", status=500)
-
-        with open(output_path, "rb") as f:
-            data = f.read()
-
-    return send_file(
-        io.BytesIO(data),
+        try:
+            config = auto_editor.RenderConfig(
+                script=script_path,
+                bg_color=bg_color,
+                cps=float(cps),
+                subtitle_max_len=int(subtitle_max_len),
+                bgm_volume=float(bgm_volume),
+                voice_volume=float(voice_volume),
+                category_boost=float(category_boost),
+                tag_boost=float(tag_boost),
+            )
+        except ValueError as exc:
+            abandon()
+            return Response(f"invalid parameter: {exc}", status=400)
+
+        # Uploads go in their own directory, apart from script.txt and output.mp4.
+        inputs = os.path.join(tmpdir, "inputs")
+        try:
+            config.bg_dir = attach_pack(os.path.join(inputs, "images"), held, sources)
+            config.bg_image = attach_file("bg_image", inputs, held, sources)
+            config.bgm = attach_file("bgm_file", inputs, held, sources)
+            config.keyword_dict = attach_json(
+                "keyword_dict", inputs, held, sources, "keywords.json"
+            )
+            config.category_map = attach_json(
+                "category_map", inputs, held, sources, "categories.json"
+            )
+            config.image_tags = attach_json(
+                "image_tags", inputs, held, sources, "image-tags.json"
+            )
+        except UploadRejected as exc:
+            abandon()
+            return Response(f"invalid upload: {exc}", status=400)
+
+        config.output = os.path.join(tmpdir, "output.mp4")
+    except Exception:
+        abandon()
+        raise
+
+    # Uploads are on disk now; the render itself runs on the job pool.
+    job = RenderJob(tmpdir, config, held, render_key(config, script_text, sources))
+    try:
+        submitted = job_queue.submit(job)
+    except Exception:
+        abandon()
+        raise
+    if not submitted:
+        abandon()
+        return Response("render queue is full, retry later", status=503)
+    return (
+        jsonify(
+            {
+                "job_id": job.id,
+                "status_url": f"/api/jobs/{job.id}",
+                "result_url": f"/api/jobs/{job.id}/result",
+            }
+        ),
+        202,
+    )
+
+
+@app.route("/api/assets/<digest>", methods=["GET"])
+def asset_info(digest):
+    # Preflight for clients: a 200 (or HEAD 200) means the file or zip pack
+    # can be sent as <field>_sha256 instead of being uploaded again.
+    info = asset_store.info(digest.lower())
+    if info is None:
+        return Response("asset not found", status=404)
+    return jsonify(info)
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return Response("job not found", status=404)
+    return jsonify(job.to_dict())
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return Response("job not found", status=404)
+    if job.status == "failed":
+        return Response(f"generation failed: {job.error}", status=500)
+    if job.status != "done":
+        return Response("job not finished", status=409)
+
+    # Served from disk in chunks with Range/conditional support, so memory
+    # per download does not grow with the video size.
+    response = send_file(
+        job.config.output,
         mimetype="video/mp4",
         as_attachment=True,
         download_name="editopia.mp4",
+        conditional=True,
     )
+    if response.status_code == 200:
+        # A complete download ends the job; partial (206) fetches keep the
+        # file for further ranges until the TTL sweep.
+        response.call_on_close(lambda: job_queue.discard(job.id))
+    return response
 
 
 if __name__ == "__main__":